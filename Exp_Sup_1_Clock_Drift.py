@@ -7,13 +7,19 @@ Exp_Sup_1.py
 2. 验证安全裕量：证明 Adaptive (蓝线) 利用自适应机制能容忍更高的漂移。
 """
 
+import os
+
+# 每个 worker 进程内的 BLAS/OpenMP 只用单线程，避免 "进程数 × 线程数" 超额订阅 CPU。
+# 必须在 numpy/pandas 首次导入之前设置 (子进程会继承该环境变量)
+for _var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+    os.environ.setdefault(_var, '1')
+
 import logging
 import random
-import os
 import concurrent.futures
 import multiprocessing
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 # --- 导入核心组件 ---
 from framework import (
@@ -24,7 +30,7 @@ from framework import (
     ReaderCommand,
     PacketType
 )
-from Tool import SimulationAnalytics
+from Tool import SimulationAnalytics, resolve_max_workers, build_base_tags
 
 # --- 导入算法 ---
 from lods_mti_algo import LODS_MTI_Algorithm         # 蓝线 (Adaptive)
@@ -49,11 +55,35 @@ while idx <= 0.005001:
 
 REPEAT = 40
 OUTPUT_DIR = "Results_Exp_Sup_1"
-MAX_WORKERS = max(1, os.cpu_count() - 2) 
 
-def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
+# 可通过环境变量 LODS_MAX_WORKERS 手动指定进程数
+MAX_WORKERS = resolve_max_workers()
+
+# 算法编号表: 子进程只回传 algo_id，主进程据此还原算法标签
+ALGO_TYPES = ('adaptive', 'fixed_128')
+ALGO_LABELS = (
+    "LODS-MTI (Adaptive)",       # 蓝线
+    "LODS-Fixed-128 (Stress)",   # 红线
+)
+
+# framework 返回的物理层统计字段 (按固定顺序打包进结果元组)
+STATS_KEYS = (
+    'total_time_us',
+    'total_reader_energy_j',
+    'total_tag_energy_j',
+    'total_slots',
+    'success_slots',
+    'collision_slots',
+    'idle_slots',
+    'phy_efficiency',
+)
+
+def run_task(task_params: Dict[str, Any]) -> Tuple[Any, ...]:
     """
     单个实验任务
+
+    返回紧凑的数值元组，避免将完整的 stats/sim_config 字典 pickle 回主进程:
+        (run_id, algo_id, drift_rate, recall, goodput, total_time_us, *其余 STATS_KEYS)
     """
     # 解包参数
     drift_rate = task_params['drift_rate']
@@ -62,7 +92,8 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     
     # 1. 生成场景 (Seed 绑定 run_id)
     # 保持实验的可重复性，使得红蓝两线在面对同一组标签分布时进行 PK
-    tags = [Tag(format(0xE2000000 + i, '024X')) for i in range(TAG_COUNT)]
+    # EPC 列表每个 worker 只生成一次 (build_base_tags 缓存)
+    tags = [Tag(epc) for epc in build_base_tags(TAG_COUNT)]
     rng = random.Random(run_id) 
     rng.shuffle(tags)
     
@@ -76,12 +107,10 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
         # 蓝线: 开启自适应 (Adaptive Mode)
         # 预期行为: 遇到漂移导致误码上升时，自动降速保可靠性
         algo = LODS_MTI_Algorithm(is_adaptive=True, target_rho=4) 
-        label = "LODS-MTI (Adaptive)"
     elif algo_type == 'fixed_128':
         # 红线: 压力测试专用 (Fixed-128)
         # 预期行为: 死板地坚持 K=128，直到漂移导致同步丢失
         algo = LODS_MTI_Sup_Algo() # 默认参数即为 fixed 128
-        label = "LODS-Fixed-128 (Stress)"
     else:
         raise ValueError(f"Unknown algo_type: {algo_type}")
 
@@ -103,7 +132,7 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     # (1) Reliability / Recall
     present_gt = {t.epc for t in tags if t.is_present}
     found_present, _ = algo.get_results()
-    tp = len(found_present.intersection(present_gt))
+    tp = len(found_present & present_gt)
     recall = tp / len(present_gt) if present_gt else 0
     
     # (2) Goodput (Effective Throughput)
@@ -112,19 +141,25 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     total_time_s = stats['total_time_us'] / 1e6
     goodput = tp / total_time_s if total_time_s > 0 else 0
     
-    # 6. 数据封装
+    # 6. 数据封装 (紧凑元组，标签与 sim_config 由主进程还原)
+    algo_id = ALGO_TYPES.index(algo_type)
+    return (run_id, algo_id, drift_rate, recall, goodput,
+            *(stats[k] for k in STATS_KEYS))
+
+def unpack_result(res: Tuple[Any, ...]) -> Tuple[Dict, Dict, str, int]:
+    """
+    [主进程] 将 run_task 的紧凑元组还原为 analytics.add_run_result 所需的参数
+    """
+    run_id, algo_id, drift_rate, recall, goodput, *phy_stats = res
+    
     # Tool.py 会自动提取 stats 中的数值列进行平均和拆分
+    stats = dict(zip(STATS_KEYS, phy_stats))
     stats['Recall'] = recall
     stats['Goodput'] = goodput
     stats['Drift_Percent'] = drift_rate * 100
     
-    return {
-        "status": "success",
-        "stats": stats,
-        "sim_config": {"TOTAL_TAGS": TAG_COUNT, "Drift_Rate": drift_rate},
-        "algorithm_name": label,
-        "run_id": run_id
-    }
+    sim_config = {"TOTAL_TAGS": TAG_COUNT, "Drift_Rate": drift_rate}
+    return stats, sim_config, ALGO_LABELS[algo_id], run_id
 
 if __name__ == "__main__":
     multiprocessing.freeze_support()
@@ -159,14 +194,14 @@ if __name__ == "__main__":
         
         for future in concurrent.futures.as_completed(futures):
             try:
-                res = future.result()
+                stats, sim_config, label, run_id = unpack_result(future.result())
                 results_collected += 1
                 
                 analytics.add_run_result(
-                    result_stats=res['stats'],
-                    sim_config=res['sim_config'],
-                    algo_name=res['algorithm_name'],
-                    run_id=res['run_id']
+                    result_stats=stats,
+                    sim_config=sim_config,
+                    algo_name=label,
+                    run_id=run_id
                 )
                 
                 # 进度条
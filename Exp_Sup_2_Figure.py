@@ -8,16 +8,22 @@ import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
-import seaborn as sns
 import numpy as np
 from scipy.stats import gaussian_kde
 import matplotlib.transforms as transforms
+from concurrent.futures import ThreadPoolExecutor
 
 # =========================================================
 # 配置区
 # =========================================================
 INPUT_DIR = "Results_Exp_Sup_2"
 INPUT_FILE = "raw_Micro_Dynamics_Combined.csv"
+# 绘图只用到这两列 (Run_ID / Rho / Drift_Val 不解析)
+INPUT_DTYPES = {'K': 'int32', 'Scenario': 'category'}
+
+# 场景标签 (须与 Exp_Sup_2_Micro_Dynamic.SCENARIOS 中的 label 保持一致)
+SCENARIO_IDEAL = 'Ideal (Drift=0%)'
+SCENARIO_STRESS = 'Stress (Drift=0.15%)'
 OUTPUT_DIR = "Paper_Figures/Exp_Sup_2_Micro_Dynamics"
 
 # --- 顶刊级配色方案 (Nature/Science Style) ---
@@ -35,10 +41,11 @@ def get_kde_peak(data, bw_method=None):
     """
     辅助函数：计算数据的 KDE 峰值 (Mode)
     """
-    if len(data) == 0: return 0
+    data = np.asarray(data)
+    if data.size == 0: return 0
     kde = gaussian_kde(data, bw_method=bw_method)
     # 在数据范围内生成细密网格寻找最大值
-    x_grid = np.linspace(min(data)*0.8, max(data)*1.2, 1000)
+    x_grid = np.linspace(data.min()*0.8, data.max()*1.2, 1000)
     y_grid = kde(x_grid)
     peak_x = x_grid[np.argmax(y_grid)]
     return peak_x, kde(peak_x)[0]
@@ -56,13 +63,14 @@ def draw_comparison_figure():
         d2 = np.random.normal(65, 2, 1000)   # Ideal
         df = pd.DataFrame({
             'K': np.concatenate([d1, d2]),
-            'Scenario': ['Stress']*1000 + ['Ideal']*1000
+            'Scenario': pd.Categorical([SCENARIO_STRESS]*1000 + [SCENARIO_IDEAL]*1000)
         })
     else:
-        df = pd.read_csv(csv_path)
+        df = pd.read_csv(csv_path, usecols=list(INPUT_DTYPES), dtype=INPUT_DTYPES)
 
-    df_ideal = df[df['Scenario'].str.contains("Ideal")]
-    df_stress = df[df['Scenario'].str.contains("Stress")]
+    # Scenario 为分类类型，等值比较只比对整数编码
+    df_ideal = df[df['Scenario'] == SCENARIO_IDEAL]
+    df_stress = df[df['Scenario'] == SCENARIO_STRESS]
 
     # =====================================================
     # 0. 画布设置 (使用 Arial 字体)
@@ -79,10 +87,14 @@ def draw_comparison_figure():
     # =====================================================
     # 1. 动态计算峰值 (实现完美居中对齐)
     # =====================================================
-    # 计算 Stress 场景的峰值
-    peak_stress_x, peak_stress_y = get_kde_peak(df_stress['K'], bw_method=0.5)
-    # 计算 Ideal 场景的峰值
-    peak_ideal_x, peak_ideal_y = get_kde_peak(df_ideal['K'], bw_method=1.0)
+    # 两个场景的 KDE 相互独立，scipy 的核计算会释放 GIL，可用线程并行
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        # 计算 Stress 场景的峰值
+        fut_stress = pool.submit(get_kde_peak, df_stress['K'].to_numpy(), 0.5)
+        # 计算 Ideal 场景的峰值
+        fut_ideal = pool.submit(get_kde_peak, df_ideal['K'].to_numpy(), 1.0)
+        peak_stress_x, peak_stress_y = fut_stress.result()
+        peak_ideal_x, peak_ideal_y = fut_ideal.result()
     
     print(f"🔍 Detected Peaks -> Stress: {peak_stress_x:.2f}, Ideal: {peak_ideal_x:.2f}")
 
@@ -112,26 +124,42 @@ def draw_comparison_figure():
     # =====================================================
     # 3. 数据绘制 (Layer 1 - 中层)
     # =====================================================
-    bins = range(0, 145, 3) # 稍微细化 Bin
+    bins = np.arange(0, 145, 3) # 稍微细化 Bin
+    bin_width = bins[1] - bins[0]
+    
+    # 直方图直接用 np.histogram 预计算 (等价于 histplot 的 stat='probability')，
+    # 两个场景共用同一组 bin，绕开 seaborn 逐次的数据检查开销
+    hist_stress, _ = np.histogram(df_stress['K'], bins=bins)
+    hist_ideal, _ = np.histogram(df_ideal['K'], bins=bins)
+    # 与 seaborn 一致: 按落入 bin 的样本数归一化 (全部落在范围外时避免除零)
+    prob_stress = hist_stress / max(hist_stress.sum(), 1)
+    prob_ideal = hist_ideal / max(hist_ideal.sum(), 1)
     
     # --- Stress Case (红色) ---
-    sns.histplot(data=df_stress, x='K', bins=bins, stat='probability',
-                 color=COLOR_STRESS_FILL, alpha=0.6, edgecolor='white', linewidth=0.5,
-                 ax=ax, zorder=10, label='_nolegend_')
+    ax.bar(bins[:-1], prob_stress, width=bin_width, align='edge',
+           color=COLOR_STRESS_FILL, alpha=0.6, edgecolor='white', linewidth=0.5,
+           zorder=10, label='_nolegend_')
     
     # --- Ideal Case (蓝色) ---
-    sns.histplot(data=df_ideal, x='K', bins=bins, stat='probability',
-                 color=COLOR_IDEAL_FILL, alpha=0.4, edgecolor='white', linewidth=0.5,
-                 ax=ax, zorder=5, label='_nolegend_')
+    ax.bar(bins[:-1], prob_ideal, width=bin_width, align='edge',
+           color=COLOR_IDEAL_FILL, alpha=0.4, edgecolor='white', linewidth=0.5,
+           zorder=5, label='_nolegend_')
 
     # KDE 曲线使用副轴 (Twinx)
     ax_kde = ax.twinx()
     
-    sns.kdeplot(data=df_stress['K'], color=COLOR_STRESS_LINE, linewidth=3, 
-                ax=ax_kde, bw_adjust=0.6, fill=False, zorder=11, label='Stress (Drift=10%): Robust')
+    # KDE: Scott 带宽再乘以调整系数 (与 sns.kdeplot 的 bw_adjust 语义一致)
+    xs = np.linspace(0, 145, 500)
+    kde_stress = gaussian_kde(df_stress['K'].to_numpy())
+    kde_stress.set_bandwidth(kde_stress.factor * 0.6)
+    kde_ideal = gaussian_kde(df_ideal['K'].to_numpy())
+    kde_ideal.set_bandwidth(kde_ideal.factor * 1.0)
+    
+    ax_kde.plot(xs, kde_stress(xs), color=COLOR_STRESS_LINE, linewidth=3, 
+                zorder=11, label='Stress (Drift=10%): Robust')
     
-    sns.kdeplot(data=df_ideal['K'], color=COLOR_IDEAL_LINE, linestyle='--', linewidth=2.5, 
-                ax=ax_kde, bw_adjust=1.0, fill=False, zorder=6, label='Ideal (No Drift): High Speed')
+    ax_kde.plot(xs, kde_ideal(xs), color=COLOR_IDEAL_LINE, linestyle='--', linewidth=2.5, 
+                zorder=6, label='Ideal (No Drift): High Speed')
 
     # =====================================================
     # 4. 关键标注与修饰 (Layer 2 - 顶层)
@@ -180,7 +208,7 @@ def draw_comparison_figure():
     ax_kde.set_ylabel("")
 
     # 设置 Y 轴上限，留出头部空间
-    hist_max = np.histogram(df_stress['K'], bins=bins, density=False)[0].max() / len(df_stress)
+    hist_max = prob_stress.max()
     ax.set_ylim(0, hist_max * 1.4) # 留出 40% 头部空间给图例和文字
     ax_kde.set_ylim(0, ax_kde.get_ylim()[1] * 1.2)
 
@@ -7,9 +7,15 @@ Exp_Sup_2.py (V2 - Multi-Scenario)
 支持多场景对比 (0% vs 10%)，并将数据清洗为 Tidy Format 统一存储。
 """
 
+import os
+
+# 每个 worker 进程内的 BLAS/OpenMP 只用单线程，避免 "进程数 × 线程数" 超额订阅 CPU。
+# 必须在 numpy/pandas 首次导入之前设置 (子进程会继承该环境变量)
+for _var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+    os.environ.setdefault(_var, '1')
+
 import logging
 import random
-import os
 import concurrent.futures
 import multiprocessing
 import pandas as pd
@@ -25,6 +31,7 @@ from framework import (
     ReaderCommand,
     AlgorithmInterface
 )
+from Tool import resolve_max_workers, build_base_tags
 from lods_mti_algo import LODS_MTI_Algorithm
 
 # 日志配置
@@ -73,7 +80,9 @@ SCENARIOS = [
 
 REPEAT = 50        # 每个场景跑 50 次
 OUTPUT_DIR = "Results_Exp_Sup_2"
-MAX_WORKERS = max(1, os.cpu_count() - 2)
+
+# 可通过环境变量 LODS_MAX_WORKERS 手动指定进程数
+MAX_WORKERS = resolve_max_workers()
 
 def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -84,7 +93,8 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     label = task_params['label']
     
     # 1. 生成场景
-    tags = [Tag(format(0xE2000000 + i, '024X')) for i in range(TAG_COUNT)]
+    # EPC 列表每个 worker 只生成一次 (build_base_tags 缓存)
+    tags = [Tag(epc) for epc in build_base_tags(TAG_COUNT)]
     rng = random.Random(run_id) 
     rng.shuffle(tags)
     
@@ -137,6 +147,7 @@ if __name__ == "__main__":
         
     print(f"🚀 启动 Exp_Sup_2: 微观动力学分析 (Multi-Scenario)")
     print(f"🎯 对比场景: {[s['label'] for s in SCENARIOS]}")
+    print(f"⚙️  Workers={MAX_WORKERS}, Repeat={REPEAT}")
     
     # 构建任务列表 (双重循环)
     tasks = []
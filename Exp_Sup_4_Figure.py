@@ -22,6 +22,13 @@ OUTPUT_DIR = "Paper_Figures/Exp_Sup_4_Tolerance"
 FILE_GOODPUT = "raw_Goodput.csv"
 FILE_RECALL = "raw_Recall.csv"
 
+# 全量数据中绘图实际用到的列 (只解析这些列，并跳过类型推断)
+RAW_DTYPES = {
+    'Tolerance_Threshold': 'float64',
+    'Goodput': 'float64',
+    'Recall': 'float64',
+}
+
 # --- 用户指定的配色方案 ---
 COLOR_IDEAL_FILL  = "#A6CEE3"    # 柔和蓝 (Goodput 填充)
 COLOR_IDEAL_LINE  = "#1F78B4"    #以此为主的深蓝 (Goodput 线条)
@@ -54,7 +61,7 @@ def draw_sensitivity_figure():
         # 备选方案: 如果全量文件不在，说明 Tool.py 版本不同，请确保数据存在
         return
         
-    df_raw = pd.read_csv(path_raw)
+    df_raw = pd.read_csv(path_raw, usecols=lambda c: c in RAW_DTYPES, dtype=RAW_DTYPES)
     
     # 聚合数据
     if 'Tolerance_Threshold' not in df_raw.columns:
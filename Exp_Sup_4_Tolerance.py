@@ -12,13 +12,13 @@ Exp_Sup_4_Tolerance.py
 """
 
 import logging
-import random
 import os
+import sys
 import concurrent.futures
 import multiprocessing
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import Dict, Any
 
 # --- 导入核心组件 ---
 from framework import (
@@ -29,7 +29,7 @@ from framework import (
     ReaderCommand,
     PacketType
 )
-from Tool import SimulationAnalytics
+from Tool import SimulationAnalytics, resolve_max_workers, build_base_tags, build_permutation
 
 # --- 导入专用算法 ---
 # 注意：这里导入的是刚才新建的 sensitivity 类
@@ -57,9 +57,10 @@ FIXED_BER = 0.06
 
 REPEAT = 10 # 次数多一点以消除随机性
 OUTPUT_DIR = "Results_Exp_Sup_4"
-MAX_WORKERS = max(1, os.cpu_count() - 2) 
+# 可通过环境变量 LODS_MAX_WORKERS 手动指定进程数
+MAX_WORKERS = resolve_max_workers()
 
-def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
+def _simulate_one(task_params: Dict[str, Any]) -> Dict[str, Any]:
     """
     单个实验任务
     """
@@ -67,13 +68,12 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     run_id = task_params['run_id']
     
     # 1. 生成场景
-    tags = [Tag(format(0xE2000000 + i, '024X')) for i in range(TAG_COUNT)]
-    rng = random.Random(run_id) 
-    rng.shuffle(tags)
-    
+    # 用 numpy 置换代替 Python 列表洗牌: 置换的前 missing_count 个下标标记为缺失
     missing_count = int(TAG_COUNT * MISSING_RATE)
-    for i in range(missing_count): 
-        tags[i].is_present = False
+    present_flags = np.ones(TAG_COUNT, dtype=bool)
+    perm = build_permutation(TAG_COUNT, run_id)
+    present_flags[perm[:missing_count]] = False
+    tags = [Tag(epc, flag) for epc, flag in zip(build_base_tags(TAG_COUNT), present_flags.tolist())]
     
     # 2. 实例化算法 (传入当前遍历的 tolerance)
     algo = LODS_MTI_Sensitivity(
@@ -128,8 +128,21 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
         "run_id": run_id
     }
 
+def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    worker 入口: executor.map 中任一任务抛异常会中断整个迭代，这里兜底
+    """
+    try:
+        return _simulate_one(task_params)
+    except Exception as e:
+        return {"status": "error", "error": f"eps={task_params['tolerance']}, run={task_params['run_id']}: {e}"}
+
 if __name__ == "__main__":
     multiprocessing.freeze_support()
+    # Linux 下用 fork: worker 直接继承已导入的模块与缓存表 (COW)，省去 spawn 的重复导入
+    if sys.platform.startswith('linux'):
+        multiprocessing.set_start_method('fork', force=True)
+    build_base_tags(TAG_COUNT)  # 父进程预热缓存，fork 出的 worker 直接继承
     
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
@@ -137,11 +150,9 @@ if __name__ == "__main__":
         
     print(f"🚀 启动 Exp_Sup_4: 容忍度参数敏感性分析")
     print(f"🎯 目标: 寻找 epsilon 的 Sweet Spot (预期 0.30)")
-    print(f"⚙️  Env: BER={FIXED_BER*100}%, Repeat={REPEAT}")
+    print(f"⚙️  Env: BER={FIXED_BER*100}%, Repeat={REPEAT}, Workers={MAX_WORKERS}")
     print(f"📉 Range: epsilon = {TOLERANCE_LIST}")
     
-    analytics = SimulationAnalytics()
-    
     # 2. 构建任务
     tasks = []
     for eps in TOLERANCE_LIST:
@@ -153,32 +164,32 @@ if __name__ == "__main__":
 
     # 3. 并行执行
     results_collected = 0
+    records = []  # 扁平记录列表，结束后一次性建表
+    # map + chunksize: 按批投递任务，减少逐任务的 IPC 往返
+    chunksize = max(1, total_tasks // (MAX_WORKERS * 4))
     with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [executor.submit(run_task, t) for t in tasks]
-        
-        for future in concurrent.futures.as_completed(futures):
-            try:
-                res = future.result()
-                results_collected += 1
-                
-                analytics.add_run_result(
-                    result_stats=res['stats'],
-                    sim_config=res['sim_config'],
-                    algo_name=res['algorithm_name'], # 这里其实主要用 X 轴区分
-                    run_id=res['run_id']
-                )
-                
-                if results_collected % 50 == 0 or results_collected == total_tasks:
-                    progress = results_collected / total_tasks
-                    print(f"\r🚀 进度: {progress:.1%} ({results_collected}/{total_tasks})", end="")
-                
-            except Exception as e:
-                logger.error(f"❌ Error: {e}")
+        for res in executor.map(run_task, tasks, chunksize=chunksize):
+            results_collected += 1
+            
+            if res['status'] == 'success':
+                records.append({
+                    'algorithm_name': res['algorithm_name'], # 这里其实主要用 X 轴区分
+                    'run_id': res['run_id'],
+                    **res['sim_config'],
+                    **res['stats']
+                })
+            else:
+                logger.error(f"❌ Error: {res['error']}")
+            
+            if results_collected % 50 == 0 or results_collected == total_tasks:
+                progress = results_collected / total_tasks
+                print(f"\r🚀 进度: {progress:.1%} ({results_collected}/{total_tasks})", end="")
 
     print("\n✅ 仿真结束。正在生成数据文件...")
     
     # 4. 保存数据
     # 关键：以 'Tolerance_Threshold' 为 X 轴
+    analytics = SimulationAnalytics.from_dataframe(pd.DataFrame(records))
     analytics.save_to_csv(x_axis_key='Tolerance_Threshold', output_dir=OUTPUT_DIR)
     
     print(f"💾 数据保存完毕: {OUTPUT_DIR}/")
@@ -6,13 +6,14 @@ Exp_Sup_5_Repair.py
 """
 
 import logging
-import random
 import os
+import sys
 import math 
 import concurrent.futures
 import multiprocessing
 import pandas as pd
-from typing import Dict, Any, List, Tuple, Optional
+import numpy as np
+from typing import Dict, Any
 import traceback
 
 # --- 导入基础框架 (确保 framework.py 在同级目录) ---
@@ -20,155 +21,33 @@ try:
     from framework import (
         run_high_fidelity_simulation, 
         SimulationConfig, 
-        Tag, AlgorithmInterface, ReaderCommand, SlotResult, PacketType
+        Tag, ReaderCommand, SlotResult
     )
-    from Tool import SimulationAnalytics
+    from Tool import SimulationAnalytics, resolve_max_workers, build_base_tags, build_permutation
+    from lods_mti_sensitivity import LODS_MTI_Sensitivity, EPC_BITS
 except ImportError:
-    print("❌ 严重错误: 缺少 framework.py 或 Tool.py，请检查文件完整性。")
+    print("❌ 严重错误: 缺少 framework.py、Tool.py 或 lods_mti_sensitivity.py，请检查文件完整性。")
     exit(1)
 
 # =========================================================
-# 🛠️ 内嵌核心算法类 (LODS_MTI_Sensitivity)
-# 避免因文件版本不一致导致的 AttributeError/TypeError
+# 🛠️ 核心算法类 (LODS_MTI_Sensitivity 的容错变体)
+# 布局缓存、分片与种子搜索均直接复用 lods_mti_sensitivity，
+# 这里只覆盖校验 / 调度一步: 兼容旧版 framework 的 SlotResult，并使用固定的 5 位 CRC 开销
 # =========================================================
-class LODS_MTI_Sensitivity_Embedded(AlgorithmInterface):
-    def __init__(self, 
-                 max_group_size: int = 128, 
-                 target_rho: int = 4,       
-                 is_adaptive: bool = True,
-                 max_payload_bit: int = 256,
-                 tolerance_threshold: float = 0.30): # <--- 关键参数
-        
-        self.max_group_size = max_group_size
-        self.is_adaptive = is_adaptive
-        self.target_rho = target_rho
-        self.max_payload_bit = max_payload_bit
-        self.tolerance_threshold = tolerance_threshold 
-
-        if self.is_adaptive:
-            self.current_rho = 4 
-        else:
-            self.current_rho = target_rho
-            
-        self.sorted_tags_bin = []   
-        self.total_tags = 0
-        self.cursor = 0
-        self.is_running = True
-        self.last_sent_context = [] 
-        self.verified_present = set()
-        self.verified_missing = set()
-
-    def initialize(self, expected_tags: List[Tag]):
-        temp_list = []
-        for t in expected_tags:
-            b_str = bin(int(t.epc, 16))[2:].zfill(96)
-            temp_list.append({'hex': t.epc, 'bin': b_str, 'int': t.epc_int})
-        
-        self.sorted_tags_bin = sorted(temp_list, key=lambda x: x['bin'])
-        self.total_tags = len(self.sorted_tags_bin)
-        self.cursor = 0
-        self.is_running = True
-        self.verified_present = set()
-        self.verified_missing = set()
-        self.last_sent_context = []
-        
-        if self.is_adaptive:
-            self.current_rho = 4
-        else:
-            self.current_rho = self.target_rho
-
-    def _get_lcp(self, str1: str, str2: str) -> str:
-        l = min(len(str1), len(str2))
-        for i in range(l):
-            if str1[i] != str2[i]: return str1[:i]
-        return str1[:l]
-
-    def _find_dynamic_slice(self, start_idx: int, limit_k_override: int = None) -> Tuple[int, str]:
-        remaining = self.total_tags - start_idx
-        if remaining == 0: return 0, ""
-        limit_k = min(self.max_group_size, remaining)
-        if limit_k_override is not None: limit_k = min(limit_k, limit_k_override)
-        
-        if start_idx + limit_k >= self.total_tags:
-            group_first = self.sorted_tags_bin[start_idx]['bin']
-            group_last = self.sorted_tags_bin[start_idx + limit_k - 1]['bin']
-            return limit_k, self._get_lcp(group_first, group_last)
-
-        for k in range(limit_k, 0, -1):
-            idx_last = start_idx + k - 1
-            tag_first = self.sorted_tags_bin[start_idx]['bin']
-            tag_last = self.sorted_tags_bin[idx_last]['bin']
-            current_lcp = self._get_lcp(tag_first, tag_last)
-            idx_outside = start_idx + k
-            tag_outside = self.sorted_tags_bin[idx_outside]['bin']
-            if tag_outside.startswith(current_lcp): continue 
-            else: return k, current_lcp     
-        return 1, self.sorted_tags_bin[start_idx]['bin']
-
-    def _find_perfect_seed(self, epc_ints: List[int], mod_size: int) -> Optional[int]:
-        for seed in range(16):
-            slots = set()
-            collision = False
-            for val in epc_ints:
-                s = (val ^ seed) % mod_size
-                if s in slots:
-                    collision = True
-                    break
-                slots.add(s)
-            if not collision: return seed
-        return None
-
+class LODS_MTI_Sensitivity_Embedded(LODS_MTI_Sensitivity):
     def get_next_command(self, prev_result: SlotResult) -> ReaderCommand:
         error_flag = False
         
         # --- Phase 1: Verification ---
         if self.last_sent_context:
-            ideal_bitmap = 0
             # 安全获取实际响应者 (防止 None)
             actual_responders = set(prev_result.tag_ids) if prev_result.tag_ids else set()
-
-            for item in self.last_sent_context:
-                if item['epc'] in actual_responders:
-                    rho_used = item['rho']
-                    start_bit = item['slot'] * rho_used
-                    ideal_bitmap |= (((1 << rho_used) - 1) << start_bit)
-
             # 安全获取噪声掩码 (防止旧版 framework 报错)
             noise_mask = getattr(prev_result, 'channel_noise_mask', 0)
-            received_bitmap = ideal_bitmap ^ noise_mask
-            
-            last_rho = self.last_sent_context[0]['rho']
-            vote_threshold = 3 if last_rho >= 4 else last_rho
-            total_checks = 0
-            error_cnt = 0
-            
-            for item in self.last_sent_context:
-                total_checks += 1
-                rho = item['rho']
-                start_bit = item['slot'] * rho
-                expected_mask = ((1 << rho) - 1) << start_bit
-                segment = received_bitmap & expected_mask
-                match_count = bin(segment).count('1')
-                
-                if match_count >= vote_threshold:
-                    self.verified_present.add(item['epc'])
-                    if match_count < rho: 
-                        error_flag = True
-                        error_cnt += 1
-                else:
-                    self.verified_missing.add(item['epc'])
-                    error_cnt += 1 # Missing 也算 Error
-            
-            # --- Adaptation Logic ---
-            if self.is_adaptive and total_checks > 0:
-                error_rate = error_cnt / total_checks
-                if error_rate <= self.tolerance_threshold:
-                    self.current_rho = 2 
-                else:
-                    self.current_rho = 4 
-            
-            self.last_sent_context = []
+            error_flag = self._verify_last_group(actual_responders, noise_mask)
 
+        # 游标单调前移: 有序数组中 cursor 之前的标签均已判定、之后均未判定，
+        # 后缀 [cursor:] 即活动集合，分片 / 种子搜索从不触及已判定标签，无需额外的活动掩码
         if self.cursor >= self.total_tags:
             self.is_running = False
             return ReaderCommand(payload_bits=-1, expected_reply_bits=0)
@@ -183,63 +62,35 @@ class LODS_MTI_Sensitivity_Embedded(AlgorithmInterface):
         current_limit_k = min(self.max_group_size, max_phys_k)
         current_limit_k = min(current_limit_k, self.total_tags - self.cursor)
 
-        final_k = 0; final_mask = ""; final_seed = 0; final_reply_bits = 0; final_num_slots = 0
-        
-        # 种子搜索重试逻辑
-        search_k = current_limit_k
-        while search_k > 0:
-            k, mask = self._find_dynamic_slice(self.cursor, limit_k_override=search_k)
-            desired_len = k * active_rho
-            reply_bits = max(4, min(desired_len, MAX_REPLY_BITS))
-            num_logical_slots = max(1, reply_bits // active_rho)
-            
-            current_group_indices = range(self.cursor, self.cursor + k)
-            epc_ints = [self.sorted_tags_bin[i]['int'] for i in current_group_indices]
-            seed = self._find_perfect_seed(epc_ints, num_logical_slots)
-            
-            if seed is not None:
-                final_k = k; final_mask = mask; final_seed = seed
-                final_reply_bits = reply_bits; final_num_slots = num_logical_slots
-                break
-            else:
-                search_k = k - 1 # 缩小范围重试
+        (final_k, final_mask, final_seed, final_reply_bits, final_num_slots,
+         final_slots) = self._plan_group(self.cursor, current_limit_k, active_rho, MAX_REPLY_BITS)
         
-        # 兜底：如果搜索彻底失败 (极罕见)，强制只处理 1 个标签
-        if final_k == 0:
-            final_k = 1
-            _, final_mask = self._find_dynamic_slice(self.cursor, limit_k_override=1)
-            final_reply_bits = active_rho
-            final_num_slots = 1
-            final_seed = 0
-
-        current_group = self.sorted_tags_bin[self.cursor : self.cursor + final_k]
-        current_context = []
-        for item in current_group:
-            s = (item['int'] ^ final_seed) % final_num_slots
-            current_context.append({'epc': item['hex'], 'slot': s, 'rho': active_rho})
-        self.last_sent_context = current_context
+        # 上下文以列存储: EPC 元组 + 时隙数组，供下一轮整组向量化校验
+        self.last_sent_context = self.epc_hex[self.cursor : self.cursor + final_k]
+        self.last_sent_slots = final_slots
+        self.last_sent_rho = active_rho
+        self.last_sent_num_slots = final_num_slots
 
-        base_len = len(final_mask) + 8
+        mask_val, mask_len = final_mask
+        base_len = mask_len + 8
         payload_cost = base_len + 5
         
+        mask_shift = EPC_BITS - mask_len
         def protocol_logic(tag: Tag) -> bool:
-            t_bin = bin(int(tag.epc, 16))[2:].zfill(96)
-            return t_bin.startswith(final_mask)
+            return (tag.epc_int >> mask_shift) == mask_val
             
         cmd = ReaderCommand(payload_bits=payload_cost, expected_reply_bits=final_reply_bits, response_protocol=protocol_logic)
         self.cursor += final_k
         return cmd
 
-    def is_finished(self) -> bool: return not self.is_running
-    def get_results(self): return self.verified_present, self.verified_missing
-
 # =========================================================
 # 🧪 实验主逻辑
 # =========================================================
 ROUNDS = 200
 TAG_COUNT = 1000
 OUTPUT_DIR = "Results_Exp_Sup_5_Tolerance_Recover"
-MAX_WORKERS = max(1, os.cpu_count() - 2)
+# 可通过环境变量 LODS_MAX_WORKERS 手动指定进程数
+MAX_WORKERS = resolve_max_workers()
 
 ALGO_CONFIGS = [
     {'name': 'LODS (eps=0.25)', 'eps': 0.25, 'adaptive': True},
@@ -267,21 +118,24 @@ def get_env_params(round_idx):
         current_missing = MAX_MISSING * factor
         return current_ber, current_missing
 
+# 环境剧本只取决于轮次: 模块加载时整表预计算，worker 内直接查表
+_ENV_SCHEDULE = tuple(get_env_params(r) for r in range(ROUNDS))
+
 def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     try:
         algo_conf = task_params['algo_conf']
         round_idx = task_params['round_idx']
         
-        ber, missing_rate = get_env_params(round_idx)
-        
-        tags = [Tag(format(0xE2000000 + i, '024X')) for i in range(TAG_COUNT)]
-        rng = random.Random(2026 + round_idx)
-        rng.shuffle(tags)
+        ber, missing_rate = _ENV_SCHEDULE[round_idx]
         
+        # 用 numpy 置换代替 Python 列表洗牌: 置换的前 num_missing 个下标标记为缺失
         num_missing = int(TAG_COUNT * missing_rate)
-        for i in range(num_missing): tags[i].is_present = False
+        present_flags = np.ones(TAG_COUNT, dtype=bool)
+        perm = build_permutation(TAG_COUNT, 2026 + round_idx)
+        present_flags[perm[:num_missing]] = False
+        tags = [Tag(epc, flag) for epc, flag in zip(build_base_tags(TAG_COUNT), present_flags.tolist())]
         
-        # 使用内嵌类初始化
+        # 使用容错变体初始化
         algo = LODS_MTI_Sensitivity_Embedded(
             is_adaptive=algo_conf['adaptive'], 
             target_rho=4,
@@ -320,23 +174,29 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
 
 if __name__ == "__main__":
     multiprocessing.freeze_support()
+    # Linux 下用 fork: worker 直接继承已导入的模块与缓存表 (COW)，省去 spawn 的重复导入
+    if sys.platform.startswith('linux'):
+        multiprocessing.set_start_method('fork', force=True)
+    build_base_tags(TAG_COUNT)  # 父进程预热缓存，fork 出的 worker 直接继承
     if not os.path.exists(OUTPUT_DIR): os.makedirs(OUTPUT_DIR)
         
-    print(f"🚀 启动 Exp_Sup_5_Repair (内嵌算法版)...")
+    print(f"🚀 启动 Exp_Sup_5_Repair (内嵌算法版)... Workers={MAX_WORKERS}")
     
-    analytics = SimulationAnalytics()
     tasks = []
     for r in range(ROUNDS):
         for conf in ALGO_CONFIGS:
             tasks.append({'algo_conf': conf, 'round_idx': r, 'run_id': r})
             
+    # map + chunksize: 按批投递任务，减少逐任务的 IPC 往返 (run_task 内部已兜底异常)
+    chunksize = max(1, len(tasks) // (MAX_WORKERS * 4))
+    records = []  # 扁平记录列表，结束后一次性建表
     with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [executor.submit(run_task, t) for t in tasks]
-        for i, future in enumerate(concurrent.futures.as_completed(futures)):
-            res = future.result()
+        for i, res in enumerate(executor.map(run_task, tasks, chunksize=chunksize)):
             if res['status'] == 'success':
-                analytics.add_run_result(res['stats'], res['sim_config'], res['algorithm_name'], res['run_id'])
+                records.append({'algorithm_name': res['algorithm_name'], 'run_id': res['run_id'],
+                                **res['sim_config'], **res['stats']})
             if i % 50 == 0: print(f"\r进度: {i}/{len(tasks)}", end="")
 
     print("\n✅ 仿真结束。保存数据...")
+    analytics = SimulationAnalytics.from_dataframe(pd.DataFrame(records))
     analytics.save_to_csv(x_axis_key='Round', output_dir=OUTPUT_DIR)
\ No newline at end of file
@@ -12,24 +12,24 @@ Exp_Sup_6_Hardware.py
 """
 
 import logging
-import random
 import os
+import time
 import concurrent.futures
 import multiprocessing
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 # --- 导入核心组件 ---
 from framework import (
     run_high_fidelity_simulation, 
-    SimulationConfig, 
     Tag,
     SlotResult,
     ReaderCommand,
     PacketType
 )
-from Tool import SimulationAnalytics
+from Tool import (SimulationAnalytics, resolve_max_workers, init_epc_worker,
+                  build_base_tags, build_permutation, cached_sim_config)
 
 # --- 导入对比算法 ---
 # 1. 基准版本 (Arbitrary K)
@@ -57,9 +57,21 @@ ENV_BER = 0.000
 
 REPEAT = 20 # 重复次数，确保均值平滑
 OUTPUT_DIR = "Results_Exp_Sup_6"
-MAX_WORKERS = max(1, os.cpu_count() - 2)
 
-def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
+# 可通过环境变量 LODS_MAX_WORKERS 手动指定进程数
+MAX_WORKERS = resolve_max_workers()
+
+# 自适应批大小: N=100 的任务毫秒级，N=1000 的任务秒级，固定 chunksize 两头都不合适
+BATCH_TARGET_S = 0.5   # 每批目标耗时
+BATCH_INIT = 4
+BATCH_MIN, BATCH_MAX = 1, 64
+
+# 两个对比组; 任务表里用下标 (algo_code) 代替字符串
+ALGO_VARIANTS = ('LODS_Standard', 'LODS_Limit')
+# 任务参数打包为结构化数组: 一批任务 pickle 成一段连续内存，而不是一串 dict
+TASK_DTYPE = np.dtype([('n_tags', 'i4'), ('algo_code', 'i1'), ('run_id', 'i4')])
+
+def _simulate_one(task_params: Dict[str, Any]) -> Dict[str, Any]:
     """
     单个实验任务
     """
@@ -68,9 +80,8 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     run_id = task_params['run_id']
     
     # 1. 生成场景
-    tags = [Tag(format(0xE2000000 + i, '024X')) for i in range(n_tags)]
-    rng = random.Random(run_id) 
-    rng.shuffle(tags)
+    epcs = build_base_tags(n_tags)
+    tags = [Tag(epcs[i]) for i in build_permutation(n_tags, run_id).tolist()]
     
     missing_count = int(n_tags * MISSING_RATE)
     for i in range(missing_count): 
@@ -97,8 +108,8 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     
     algo.initialize(tags)
     
-    # 3. 配置环境
-    cfg = SimulationConfig(
+    # 3. 配置环境 (每种规模一个共享配置对象)
+    cfg = cached_sim_config(
         TOTAL_TAGS=n_tags,
         ENABLE_NOISE=True,       
         packet_error_rate=0.0,   
@@ -130,6 +141,22 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
         "x_val": n_tags
     }
 
+def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    worker 入口: executor.map 中任一任务抛异常会中断整个迭代，这里兜底
+    """
+    try:
+        return _simulate_one(task_params)
+    except Exception as e:
+        return {"status": "error", "error": f"{task_params['algo_type']} N={task_params['n_tags']}, run={task_params['run_id']}: {e}"}
+
+def _batched_worker(batch: np.ndarray) -> Tuple[List[Dict[str, Any]], float]:
+    """一次 IPC 跑一批任务 (TASK_DTYPE 记录数组)，并回传 worker 内的实际耗时用于调节批大小"""
+    t0 = time.perf_counter()
+    results = [run_task({'n_tags': n, 'algo_type': ALGO_VARIANTS[code], 'run_id': r})
+               for n, code, r in batch.tolist()]
+    return results, time.perf_counter() - t0
+
 if __name__ == "__main__":
     multiprocessing.freeze_support()
     
@@ -143,46 +170,56 @@ if __name__ == "__main__":
     
     analytics = SimulationAnalytics()
     
-    # 2. 构建任务
-    tasks = []
-    # 两个对比组
-    algo_variants = ['LODS_Standard', 'LODS_Limit']
-    
-    for n in TAG_COUNTS_LIST:
-        for var in algo_variants:
-            for r in range(REPEAT):
-                tasks.append({
-                    'n_tags': n, 
-                    'algo_type': var, 
-                    'run_id': r
-                })
+    # 2. 构建任务 (按 N 排序，相邻任务耗时接近)
+    tasks = np.array([(n, code, r)
+                      for n in TAG_COUNTS_LIST
+                      for code in range(len(ALGO_VARIANTS))
+                      for r in range(REPEAT)], dtype=TASK_DTYPE)
             
     total_tasks = len(tasks)
     print(f"📋 任务装载完毕: {total_tasks} 个子任务")
 
     # 3. 并行执行
+    # 任务按 N 顺序排列，相邻任务耗时接近；按上一批的实测耗时在线调整批大小，
+    # 使每批约 BATCH_TARGET_S 秒，兼顾 IPC 开销与负载均衡
     results_collected = 0
-    with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [executor.submit(run_task, t) for t in tasks]
-        
-        for future in concurrent.futures.as_completed(futures):
-            try:
-                res = future.result()
-                results_collected += 1
-                
-                analytics.add_run_result(
-                    result_stats=res['stats'],
-                    sim_config=res['sim_config'],
-                    algo_name=res['algorithm_name'],
-                    run_id=res['run_id']
-                )
-                
-                if results_collected % 50 == 0 or results_collected == total_tasks:
-                    progress = results_collected / total_tasks
-                    print(f"\r🚀 进度: {progress:.1%} ({results_collected}/{total_tasks})", end="")
+    next_idx = 0
+    batch_size = BATCH_INIT
+    # EPC 表只在父进程生成一次，随 initializer 发给各 worker
+    epc_table = build_base_tags(max(TAG_COUNTS_LIST))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS,
+                                                initializer=init_epc_worker,
+                                                initargs=(epc_table,)) as executor:
+        pending = set()
+        while next_idx < total_tasks or pending:
+            # 保持每个 worker 手上都有一批
+            while next_idx < total_tasks and len(pending) < MAX_WORKERS:
+                batch = tasks[next_idx : next_idx + batch_size]
+                next_idx += len(batch)
+                pending.add(executor.submit(_batched_worker, batch))
+            
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                batch_results, elapsed = fut.result()
+                per_task = elapsed / len(batch_results)
+                batch_size = int(min(BATCH_MAX, max(BATCH_MIN, BATCH_TARGET_S / max(per_task, 1e-6))))
                 
-            except Exception as e:
-                logger.error(f"❌ Error: {e}")
+                for res in batch_results:
+                    results_collected += 1
+                    
+                    if res['status'] == 'success':
+                        analytics.add_run_result_soa({
+                            'algorithm_name': res['algorithm_name'],
+                            'run_id': res['run_id'],
+                            **res['sim_config'],
+                            **res['stats']
+                        })
+                    else:
+                        logger.error(f"❌ Error: {res['error']}")
+                    
+                    if results_collected % 50 == 0 or results_collected == total_tasks:
+                        progress = results_collected / total_tasks
+                        print(f"\r🚀 进度: {progress:.1%} ({results_collected}/{total_tasks})", end="")
 
     print("\n✅ 仿真结束。正在生成数据文件...")
     
@@ -14,24 +14,24 @@ Exp_Sup_7_Bit_Fly.py
 """
 
 import logging
-import random
 import os
 import concurrent.futures
 import multiprocessing
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
 
 # --- 导入核心组件 ---
 from framework import (
     run_high_fidelity_simulation, 
-    SimulationConfig, 
     Tag,
     SlotResult,
     ReaderCommand,
     PacketType
 )
-from Tool import SimulationAnalytics
+from Tool import (SimulationAnalytics, resolve_max_workers, init_epc_worker,
+                  build_base_tags, build_permutation, cached_sim_config)
 
 # --- 导入支持物理损伤透传的算法 ---
 from lods_mti_bit_fly_algo import LODS_MTI_BitFly_Algorithm
@@ -48,30 +48,43 @@ MISSING_RATE = 0.5    # 50% 缺失率，制造充足的 False Positive 机会
 REPEAT = 100           # 重复次数需足够多，因为损伤是概率性的
 
 OUTPUT_DIR = "Results_Exp_Sup_7"
-MAX_WORKERS = max(1, os.cpu_count() - 2)
+
+# 可通过环境变量 LODS_MAX_WORKERS 手动指定进程数
+MAX_WORKERS = resolve_max_workers()
 
 # 定义两组实验的自变量范围
 BURST_RANGE = list(range(0, 9))  # 0 to 8 bits
 JITTER_RANGE = list(range(0, 5)) # 0 to 4 bits
+# 对比的两种冗余模式: Fast (rho=2) vs Robust (rho=4)
+RHO_MODES = (2, 4)
+
+@lru_cache(maxsize=None)
+def _build_epc_array(n_tags: int) -> np.ndarray:
+    """EPC 的 object 数组视图，用布尔掩码一次切出 Ground Truth 集合"""
+    return np.array(build_base_tags(n_tags), dtype=object)
 
-def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
+def _build_scenario(run_id: int) -> Tuple[List[Tag], set]:
     """
-    单个实验任务
+    生成场景: 标签列表 + 在场 EPC 集合 (Ground Truth)
+    同一 run_id 下场景与 rho 无关，可供多个 rho 复用 (算法不会修改 Tag 对象)
     """
-    exp_type = task_params['exp_type'] # 'Burst' or 'Jitter'
-    x_val = task_params['x_val']       # 具体强度值
-    rho_mode = task_params['rho_mode'] # 2 or 4
-    run_id = task_params['run_id']
-    
-    # 1. 生成场景
-    tags = [Tag(format(0xE2000000 + i, '024X')) for i in range(TAG_COUNT)]
-    rng = random.Random(run_id) 
-    rng.shuffle(tags)
+    # 缓存的洗牌排列，前 missing_count 个下标标记为缺失
+    epcs = build_base_tags(TAG_COUNT)
+    perm = build_permutation(TAG_COUNT, run_id)
     
     missing_count = int(TAG_COUNT * MISSING_RATE)
-    for i in range(missing_count): 
-        tags[i].is_present = False
+    present_mask = np.ones(TAG_COUNT, dtype=bool)
+    present_mask[perm[:missing_count]] = False
+    tags = [Tag(epcs[i], bool(present_mask[i])) for i in perm.tolist()]
     
+    # Ground Truth
+    epc_arr = _build_epc_array(TAG_COUNT)
+    actual_present = set(epc_arr[present_mask].tolist())
+    return tags, actual_present
+
+def _run_one_rho(tags: List[Tag], actual_present: set, exp_type: str, x_val: int,
+                 rho_mode: int, run_id: int) -> Dict[str, Any]:
+    """在给定场景上跑一次指定 rho 的仿真"""
     # 2. 实例化算法 (使用支持 Bit-Fly 的版本)
     # 关闭自适应，强制指定 rho 以观察物理特性
     algo = LODS_MTI_BitFly_Algorithm(
@@ -93,7 +106,8 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     elif exp_type == 'Jitter':
         jitter_val = x_val
         
-    cfg = SimulationConfig(
+    # 每个损伤强度一个共享配置对象
+    cfg = cached_sim_config(
         TOTAL_TAGS=TAG_COUNT,
         ENABLE_NOISE=True,       
         packet_error_rate=0.0,   
@@ -111,15 +125,11 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     # 获取算法输出的两个集合
     verified_present, verified_missing = algo.get_results()
     
-    # Ground Truth
-    actual_present = {t.epc for t in tags if t.is_present}
-    actual_missing = {t.epc for t in tags if not t.is_present}
-    
-    # 统计 TP, FN
-    true_positives = len(verified_present.intersection(actual_present))
-    false_negatives = len(actual_present - verified_present)
+    # 统计 TP
+    n_present = len(actual_present)
+    true_positives = len(verified_present & actual_present)
     
-    recall = true_positives / len(actual_present) if actual_present else 1.0
+    recall = true_positives / n_present if n_present else 1.0
     
     stats['Reliability'] = recall
     stats['Metric_Value'] = x_val # 记录 X 轴的值方便绘图
@@ -139,6 +149,15 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
         "x_val": x_val
     }
 
+def run_task_both_rho(task_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    同一 (exp_type, x_val, run_id) 下场景只构建一次，依次跑 RHO_MODES 中的每个 rho
+    """
+    tags, actual_present = _build_scenario(task_params['run_id'])
+    return [_run_one_rho(tags, actual_present, task_params['exp_type'], task_params['x_val'],
+                         rho, task_params['run_id'])
+            for rho in RHO_MODES]
+
 if __name__ == "__main__":
     multiprocessing.freeze_support()
     
@@ -153,52 +172,49 @@ if __name__ == "__main__":
     print(f"🚀 启动 Exp_Sup_7: 微观物理层损伤鲁棒性验证")
     print(f"🎯 目标: 验证 Majority Voting 对 Burst Erasure 和 Bit Slip 的抵抗力")
     
-    # --- 实验 A: Burst Erasure ---
-    print(f"\n[Phase A] Running Burst Erasure Experiment (Len: {BURST_RANGE})...")
-    tasks_a = []
-    for x in BURST_RANGE:
-        for rho in [2, 4]:
-            for r in range(REPEAT):
-                tasks_a.append({
-                    'exp_type': 'Burst', 'x_val': x, 'rho_mode': rho, 'run_id': r
-                })
-                
-    analytics_a = SimulationAnalytics()
-    
-    with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures_a = [executor.submit(run_task, t) for t in tasks_a]
+    # 两个阶段共用同一个进程池: 只付一次 worker 启动开销，worker 内缓存跨阶段保留
+    with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS,
+                                                initializer=init_epc_worker,
+                                                initargs=(build_base_tags(TAG_COUNT),)) as executor:
+        # --- 实验 A: Burst Erasure ---
+        print(f"\n[Phase A] Running Burst Erasure Experiment (Len: {BURST_RANGE})...")
+        tasks_a = [{'exp_type': 'Burst', 'x_val': x, 'run_id': r}
+                   for x in BURST_RANGE for r in range(REPEAT)]
+                    
+        analytics_a = SimulationAnalytics()
+        
         cnt = 0
-        total = len(tasks_a)
-        for f in concurrent.futures.as_completed(futures_a):
-            res = f.result()
-            analytics_a.add_run_result(res['stats'], res['sim_config'], res['algorithm_name'], res['run_id'])
-            cnt += 1
-            if cnt % 50 == 0: print(f"\r  Progress: {cnt/total:.1%}", end="")
-            
-    analytics_a.save_to_csv(x_axis_key='Metric_Value', output_dir=dir_burst)
-    print(f"\n  ✅ Saved Burst results to {dir_burst}")
-
-    # --- 实验 B: Jitter Tolerance ---
-    print(f"\n[Phase B] Running Jitter Tolerance Experiment (Offset: {JITTER_RANGE})...")
-    tasks_b = []
-    for x in JITTER_RANGE:
-        for rho in [2, 4]:
-            for r in range(REPEAT):
-                tasks_b.append({
-                    'exp_type': 'Jitter', 'x_val': x, 'rho_mode': rho, 'run_id': r
-                })
-
-    analytics_b = SimulationAnalytics()
-    
-    with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures_b = [executor.submit(run_task, t) for t in tasks_b]
+        total = len(tasks_a) * len(RHO_MODES)
+        # 按 (x_val, run_id) 投递，chunksize 批量摊薄 IPC，同时保证任务数远多于 worker 数
+        chunksize = max(1, len(tasks_a) // (MAX_WORKERS * 4))
+        for pair_res in executor.map(run_task_both_rho, tasks_a, chunksize=chunksize):
+            for res in pair_res:
+                analytics_a.add_run_result_soa({'algorithm_name': res['algorithm_name'], 'run_id': res['run_id'],
+                                                  **res['sim_config'], **res['stats']})
+            cnt += len(pair_res)
+            if cnt % 50 == 0 or cnt == total:
+                print(f"\r  Progress: {cnt/total:.1%}", end="")
+                
+        analytics_a.save_to_csv(x_axis_key='Metric_Value', output_dir=dir_burst)
+        print(f"\n  ✅ Saved Burst results to {dir_burst}")
+
+        # --- 实验 B: Jitter Tolerance ---
+        print(f"\n[Phase B] Running Jitter Tolerance Experiment (Offset: {JITTER_RANGE})...")
+        tasks_b = [{'exp_type': 'Jitter', 'x_val': x, 'run_id': r}
+                   for x in JITTER_RANGE for r in range(REPEAT)]
+
+        analytics_b = SimulationAnalytics()
+        
         cnt = 0
-        total = len(tasks_b)
-        for f in concurrent.futures.as_completed(futures_b):
-            res = f.result()
-            analytics_b.add_run_result(res['stats'], res['sim_config'], res['algorithm_name'], res['run_id'])
-            cnt += 1
-            if cnt % 50 == 0: print(f"\r  Progress: {cnt/total:.1%}", end="")
+        total = len(tasks_b) * len(RHO_MODES)
+        chunksize = max(1, len(tasks_b) // (MAX_WORKERS * 4))
+        for pair_res in executor.map(run_task_both_rho, tasks_b, chunksize=chunksize):
+            for res in pair_res:
+                analytics_b.add_run_result_soa({'algorithm_name': res['algorithm_name'], 'run_id': res['run_id'],
+                                                  **res['sim_config'], **res['stats']})
+            cnt += len(pair_res)
+            if cnt % 50 == 0 or cnt == total:
+                print(f"\r  Progress: {cnt/total:.1%}", end="")
 
     analytics_b.save_to_csv(x_axis_key='Metric_Value', output_dir=dir_jitter)
     print(f"\n  ✅ Saved Jitter results to {dir_jitter}")
@@ -18,7 +18,6 @@ Exp_Sup_7_Figure.py
 """
 
 import os
-from Science_Figure import SciencePlotter
 
 # =========================================================
 # 配置区
@@ -56,6 +55,8 @@ if __name__ == "__main__":
         exit()
 
     # 2. 初始化绘图引擎
+    # 延迟导入: 数据检查通过后才加载 matplotlib，被其他入口 import 时也不触发后端初始化
+    from Science_Figure import SciencePlotter
     plotter = SciencePlotter(output_dir=OUTPUT_DIR)
     print(f"🎨 启动绘图引擎，源数据: {INPUT_ROOT}")
 
@@ -13,13 +13,6 @@ Exp_Sup_8_Figure.py (V5.0 - Standard Engine Call)
 import os
 import sys
 
-# 1. 导入绘图引擎
-try:
-    from Science_Figure import SciencePlotter
-except ImportError:
-    print("❌ 错误: 未找到 Science_Figure.py。")
-    sys.exit(1)
-
 # =========================================================
 # 配置区
 # =========================================================
@@ -42,6 +35,12 @@ if __name__ == "__main__":
         sys.exit(1)
 
     # 2. 初始化引擎
+    # 延迟导入: 数据检查通过后才加载 matplotlib，被其他入口 import 时也不触发后端初始化
+    try:
+        from Science_Figure import SciencePlotter
+    except ImportError:
+        print("❌ 错误: 未找到 Science_Figure.py。")
+        sys.exit(1)
     plotter = SciencePlotter(output_dir=OUTPUT_DIR)
     print(f"🎨 启动 Science_Figure V10.0 引擎...")
     print(f"   数据源: {data_file}")
@@ -9,15 +9,15 @@ Exp_Tg_Sensitivity.py (V2.0 - Real Baselines)
 """
 
 import logging
-import random
 import os
-import concurrent.futures
+import itertools
 import multiprocessing
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 
-from framework import run_high_fidelity_simulation, SimulationConfig, Tag
-from Tool import SimulationAnalytics
+from framework import run_high_fidelity_simulation, Tag
+from Tool import (SimulationAnalytics, resolve_max_workers, init_epc_worker,
+                  build_base_tags, build_permutation, cached_sim_config)
 
 # 1. 导入特殊变体算法 (LODS)
 try:
@@ -47,7 +47,9 @@ TG_RANGE = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0, 1.5,2.0]
 BASELINE_ALGOS = ['ISMTI', 'CPT'] 
 
 OUTPUT_DIR = "Results_Exp_Sup_8_Guard_Time"
-MAX_WORKERS = max(1, os.cpu_count() - 2)
+
+# 可通过环境变量 LODS_MAX_WORKERS 手动指定进程数
+MAX_WORKERS = resolve_max_workers()
 
 def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     tg_val = task_params['tg_val']
@@ -56,9 +58,8 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     algo_type = task_params['algo_type'] # 'LODS_GTA' or 'ISMTI', 'CPT'
     
     # 1. 生成标签
-    tags = [Tag(format(0xE2000000 + i, '024X')) for i in range(n_tags)]
-    rng = random.Random(run_id)
-    rng.shuffle(tags)
+    epcs = build_base_tags(n_tags)
+    tags = [Tag(epcs[i]) for i in build_permutation(n_tags, run_id).tolist()]
     
     # 2. 初始化算法
     algo = None
@@ -89,10 +90,12 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
     # 3. 配置环境
     # 注意：对于 ISMTI/CPT，GUARD_INTERVAL_BITS 不会生效(penalty=0)，
     # 因为它们不触发 concatenation，这符合物理事实(它们只有标准T1/T2)
-    sim_cfg = SimulationConfig(
+    # Baseline 任务的 tg_val 为 None，只跑一次，主进程再广播到各 Tg 点
+    # 每个 (规模, Tg) 一个共享配置对象
+    sim_cfg = cached_sim_config(
         TOTAL_TAGS=n_tags,
         ENABLE_NOISE=False,         
-        GUARD_INTERVAL_BITS=tg_val, 
+        GUARD_INTERVAL_BITS=tg_val if tg_val is not None else 0.0, 
         CLOCK_DRIFT_RATE=0.0        
     )
     
@@ -111,6 +114,30 @@ def run_task(task_params: Dict[str, Any]) -> Dict[str, Any]:
         "tg_val": tg_val
     }
 
+def _gen_lods_tasks() -> Iterator[Dict[str, Any]]:
+    """LODS 任务 (受 Tg 影响)，按需生成"""
+    for tg in TG_RANGE:
+        for r in range(REPEAT):
+            for n in TAG_COUNTS:
+                yield {
+                    'algo_type': 'LODS_GTA', 
+                    'tg_val': tg, 'run_id': r, 'n_tags': n
+                }
+
+def _gen_baseline_tasks() -> Iterator[Dict[str, Any]]:
+    """
+    Baseline 任务 (不受 Tg 影响，作为水平参考线)
+    每个 (run_id, n_tags) 只跑一次 (tg_val=None)，结果在收集时复制到所有 Tg 点；
+    规模大者先生成: 最贵的先发，尾部只剩轻任务，避免最后几个重任务串行拖尾
+    """
+    for n in sorted(TAG_COUNTS, reverse=True):
+        for name in BASELINE_ALGOS:
+            for r in range(REPEAT):
+                yield {
+                    'algo_type': name,
+                    'tg_val': None, 'run_id': r, 'n_tags': n
+                }
+
 if __name__ == "__main__":
     multiprocessing.freeze_support()
     
@@ -121,44 +148,37 @@ if __name__ == "__main__":
     print(f"🎯 Targets: LODS-MTI vs {BASELINE_ALGOS}")
     print(f"🎯 Tg Range: {TG_RANGE} bits")
     
-    tasks = []
-    
-    # 1. 生成 LODS 任务 (受 Tg 影响)
-    for tg in TG_RANGE:
-        for r in range(REPEAT):
-            for n in TAG_COUNTS:
-                tasks.append({
-                    'algo_type': 'LODS_GTA', 
-                    'tg_val': tg, 'run_id': r, 'n_tags': n
-                })
-
-    # 2. 生成 Baseline 任务 (理论上不受 Tg 影响，作为水平参考线)
-    # 我们也跑所有 Tg 点，以便在图中画出完整的线（含随机波动）
-    for name in BASELINE_ALGOS:
-        for tg in TG_RANGE:
-            for r in range(REPEAT):
-                for n in TAG_COUNTS:
-                    tasks.append({
-                        'algo_type': name,
-                        'tg_val': tg, 'run_id': r, 'n_tags': n
-                    })
+    # 两类任务耗时相差 1~2 个数量级 (N=2000: LODS ~10 ms, ISMTI ~0.1 s, CPT ~1 s)，分开投递
+    # 任务由生成器按需产出，不预先物化整个任务表；总数由各维度长度直接算出
+    n_light = len(TG_RANGE) * REPEAT * len(TAG_COUNTS)
+    n_heavy = len(BASELINE_ALGOS) * REPEAT * len(TAG_COUNTS)
                 
     analytics = SimulationAnalytics()
     
-    with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [executor.submit(run_task, t) for t in tasks]
+    # EPC 表只在父进程生成一次，随 initializer 发给各 worker
+    epc_table = build_base_tags(max(TAG_COUNTS))
+    with multiprocessing.Pool(processes=MAX_WORKERS, initializer=init_epc_worker,
+                              initargs=(epc_table,)) as pool:
         cnt = 0
-        total = len(tasks)
+        total = n_light + n_heavy
         print(f"Processing {total} tasks...")
         
-        for f in concurrent.futures.as_completed(futures):
-            res = f.result()
-            analytics.add_run_result(
-                res['stats'], 
-                res['sim_config'], 
-                res['algorithm_name'], 
-                res['run_id']
-            )
+        # 重任务 chunksize=1 保证并行度；轻任务大块投递摊薄 IPC。
+        # 两个 imap_unordered 立即入队 (重任务在前)，再依次消费，结果顺序不影响统计
+        heavy_iter = pool.imap_unordered(run_task, _gen_baseline_tasks(), chunksize=1)
+        light_iter = pool.imap_unordered(run_task, _gen_lods_tasks(),
+                                         chunksize=max(1, n_light // (MAX_WORKERS * 8)))
+        for res in itertools.chain(heavy_iter, light_iter):
+            # Baseline (tg_val=None) 的同一份 stats 广播到每个 Tg 点
+            tg_points = TG_RANGE if res['tg_val'] is None else [res['tg_val']]
+            for tg in tg_points:
+                analytics.add_run_result_soa({
+                    'algorithm_name': res['algorithm_name'],
+                    'run_id': res['run_id'],
+                    **res['sim_config'],
+                    'Guard_Interval_Bits': tg,
+                    **res['stats']
+                })
             cnt += 1
             if cnt % 20 == 0: print(f"\r Progress: {cnt/total:.1%}", end="")
             
@@ -16,6 +16,8 @@ Reference: Chu Chu et al. "Efficient missing tag identification..."
 
 import math
 import hashlib
+from bisect import bisect_right
+import numpy as np
 from typing import List, Set
 from framework import (
     AlgorithmInterface,
@@ -25,16 +27,52 @@ from framework import (
     Tag
 )
 
+_WORD_MASK = (1 << 64) - 1
+
+# [Table 1] 缺失率 q 的区间下界 (含) 与对应最优 p2
+_P2_Q_THRESH = (0.70, 0.75, 0.80, 0.85, 0.90, 0.95)
+_P2_TABLE = (2.98, 3.78, 4.90, 6.64, 10.0, 20.0)
+# 论文未给出 <0.7 的具体值，但根据 Eq.7 和低缺失率特性，
+# ISMTI 行为应退化为 SSMTI (p1 optimal ≈ 1.5)
+_P2_LOW_Q = 1.5
+_bitwise_count = getattr(np, 'bitwise_count', None)  # NumPy >= 2.0
+
+def _md5_int(prefix, seed_bytes: bytes) -> int:
+    """MD5(epc_seed) 的整数值: prefix 为已吸收 "epc_" 的 MD5 状态，copy() 后补入种子即可"""
+    h = prefix.copy()
+    h.update(seed_bytes)
+    # digest 按大端直接转整数，与 int(hexdigest, 16) 完全等价，省去十六进制往返
+    return int.from_bytes(h.digest(), 'big')
+
+def _pack_bits(flags: np.ndarray) -> np.ndarray:
+    """布尔数组沿末轴按位打包为 uint64 字数组 (第 k 位位于 word k>>6 的 bit k&63)；
+    二维输入逐行打包，多张位图一次完成"""
+    n_words = (flags.shape[-1] + 63) // 64
+    buf = np.zeros(flags.shape[:-1] + (n_words * 8,), dtype=np.uint8)
+    packed = np.packbits(flags, axis=-1, bitorder='little')
+    buf[..., :packed.shape[-1]] = packed
+    return buf.view('<u8')
+
+def _popcount(words: np.ndarray) -> int:
+    if _bitwise_count is not None:
+        return int(_bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
 class ISMTI_Algorithm(AlgorithmInterface):
     def __init__(self, initial_q: float = 0.5):
         self.initial_q_param = initial_q
         self.q = initial_q
         
-        # 集合管理
+        # 集合管理: 每个期望标签映射到稠密下标 (tag-id)，三类状态用布尔掩码表示
         self.all_expected_epcs = set()
-        self.unverified_tags = set()
-        self.present_tags = set()
-        self.missing_tags = set()
+        self._idx_epc = np.empty(0, dtype=object)  # tag-id -> EPC
+        # MD5 缓存 (实例级，随实例释放): tag-id -> 已吸收 "epc_" 的 MD5 状态；
+        # seed -> {tag-id: MD5 整数}。seed 只由轮次号决定，reset() 后的重复测试可直接复用
+        self._md5_prefixes = []
+        self._md5_cache = {}
+        self.unverified_mask = np.zeros(0, dtype=bool)
+        self.present_mask = np.zeros(0, dtype=bool)
+        self.missing_mask = np.zeros(0, dtype=bool)
         
         # 运行时参数
         self.round_idx = 0
@@ -46,17 +84,41 @@ class ISMTI_Algorithm(AlgorithmInterface):
         self.current_physical_slot = 0
         self.total_physical_slots = 0
         
-        # 向量存储 (Bit-Tracking 核心)
-        self.EV = [] # Expected Vector based on Inventory
-        self.AV = [] # Actual Vector based on PHY response
+        # 向量存储 (Bit-Tracking 核心)，均按位打包为 uint64 字数组
+        # EV 取值 {0,1,2} 拆成两张位图: EV_one (单标签映射) / EV_two (多标签映射)
+        self.EV_one = np.empty(0, dtype=np.uint64) # Expected Vector based on Inventory
+        self.EV_two = np.empty(0, dtype=np.uint64)
+        self.AV = np.empty(0, dtype=np.uint64)     # Actual Vector based on PHY response
+        
+        # 本轮哈希缓存: 一轮内 seed/f2/未验证集合均不变，每个 EPC 只算一次 MD5
+        self._slot_bits = []  # 物理时隙号 -> {该时隙应答的未验证 EPC: 时隙内比特掩码 1 << (bit_idx % w)}
+        # 同一顺序的 tag-id / EPC / 哈希数组，供 EV 构建 / 帧分析向量化使用
+        self._round_ids = np.empty(0, dtype=np.intp)
+        self._epc_list = np.empty(0, dtype=object)
+        self._epc_hash_arr = np.empty(0, dtype=np.int64)
+        self._h_word = np.empty(0, dtype=np.int64)   # 比特所在字下标 h >> 6
+        self._h_shift = np.empty(0, dtype=np.uint64) # 字内偏移 h & 63
         
         self.is_completed = False
 
     def initialize(self, expected_tags: List[Tag]):
-        self.all_expected_epcs = {t.epc for t in expected_tags}
-        self.unverified_tags = self.all_expected_epcs.copy()
-        self.present_tags.clear()
-        self.missing_tags.clear()
+        # dict.fromkeys 去重并保持首次出现顺序，下标即 tag-id
+        epcs = list(dict.fromkeys(t.epc for t in expected_tags))
+        self.all_expected_epcs = set(epcs)
+        self._idx_epc = np.array(epcs, dtype=object)
+        self._md5_prefixes = [hashlib.md5(f"{epc}_".encode()) for epc in epcs]
+        self._md5_cache = {}
+        self.reset()
+
+    def reset(self):
+        """
+        复用 initialize 建好的 EPC 下标表，只重置逐次运行的状态。
+        期望标签集合不变时 (如同规模的重复测试) 可代替 initialize 调用。
+        """
+        n = len(self._idx_epc)
+        self.unverified_mask = np.ones(n, dtype=bool)
+        self.present_mask = np.zeros(n, dtype=bool)
+        self.missing_mask = np.zeros(n, dtype=bool)
         
         self.round_idx = 0
         self.is_completed = False
@@ -72,7 +134,7 @@ class ISMTI_Algorithm(AlgorithmInterface):
         2. 构建 EV
         3. 重置 AV
         """
-        num_unverified = len(self.unverified_tags)
+        num_unverified = int(np.count_nonzero(self.unverified_mask))
         if num_unverified == 0:
             self.is_completed = True
             return
@@ -83,54 +145,61 @@ class ISMTI_Algorithm(AlgorithmInterface):
         
         # 计算虚拟帧长 f2 (vector length)
         # f2 = N_unverified / p2
-        self.f2 = max(1, int(math.ceil(num_unverified / p2)))
+        # p2 为浮点查表值，保留 math.ceil 以与既有结果逐位一致 (math.ceil 已返回 int)
+        self.f2 = max(1, math.ceil(num_unverified / p2))
         
         # 更新种子，保证每轮哈希独立
         self.seed = self.round_idx + 2025 
         
         # [Sec 5.1.1] 构建 EV (Expected Vector)
         # 0: Empty, 1: Singleton, 2: Collision (Multi-mapping)
-        self.EV = [0] * self.f2
-        temp_map = {} 
-        for epc in self.unverified_tags:
-            bit_idx = self._hash(epc, self.seed, self.f2)
-            temp_map[bit_idx] = temp_map.get(bit_idx, 0) + 1
-            
-        for b_idx, count in temp_map.items():
-            if count == 1:
-                self.EV[b_idx] = 1
-            elif count > 1:
-                self.EV[b_idx] = 2
+        # MD5 是唯一需要逐标签计算的部分；时隙号 / 比特位由哈希数组整体求出
+        self._round_ids = np.flatnonzero(self.unverified_mask)
+        self._epc_list = self._idx_epc[self._round_ids]
+        epcs = self._epc_list.tolist()
+        self._epc_hash_arr = self._hash_all(self._round_ids, self.seed, self.f2)  # 与 _epc_list 逐位对齐
+        slot_idx, bit_pos = np.divmod(self._epc_hash_arr, self.w)
+        self._h_word = self._epc_hash_arr >> 6
+        self._h_shift = (self._epc_hash_arr & 63).astype(np.uint64)
+        # 每个比特位被映射的标签数: 恰为 1 -> EV=1，>=2 -> EV=2 (两张位图一次打包)
+        counts = np.bincount(self._epc_hash_arr, minlength=self.f2)
+        self.EV_one, self.EV_two = _pack_bits(np.stack((counts == 1, counts >= 2)))
         
         # 初始化 AV，等待物理层填充
-        self.AV = [0] * self.f2
+        self.AV = np.zeros(len(self.EV_one), dtype=np.uint64)
         
         # 将虚拟向量长度 f2 映射到物理时隙 (每个时隙承载 w=96 bits)
         self.current_physical_slot = 0
-        self.total_physical_slots = math.ceil(self.f2 / self.w)
+        self.total_physical_slots = (self.f2 + self.w - 1) // self.w  # 整数向上取整
+        
+        # 按时隙预先分桶并附带比特掩码: 应答判定与波形重构都只需一次字典查找
+        slot_bits = [{} for _ in range(self.total_physical_slots)]
+        for epc, sl, b in zip(epcs, slot_idx.tolist(), bit_pos.tolist()):
+            slot_bits[sl][epc] = 1 << b
+        self._slot_bits = slot_bits
         
         self.round_idx += 1
 
     def _get_optimal_p2(self, q: float) -> float:
         """
         [Table 1] The optimal value of p2 based on missing rate q.
-        忠实复现论文表格数据。
+        忠实复现论文表格数据 (查表: q 落在哪个区间 [下界, 下一下界) 即取对应 p2)。
         """
-        if q >= 0.95: return 20.0
-        if q >= 0.90: return 10.0
-        if q >= 0.85: return 6.64
-        if q >= 0.80: return 4.90
-        if q >= 0.75: return 3.78
-        if q >= 0.70: return 2.98
-        # 论文未给出 <0.7 的具体值，但根据 Eq.7 和低缺失率特性，
-        # ISMTI 行为应退化为 SSMTI (p1 optimal ≈ 1.5)
-        return 1.5
+        i = bisect_right(_P2_Q_THRESH, q)
+        return _P2_TABLE[i - 1] if i else _P2_LOW_Q
 
-    def _hash(self, epc: str, seed: int, mod: int) -> int:
-        """MD5 Hash mimicking standard EPC C1G2 primitives"""
-        s = f"{epc}_{seed}"
-        val = int(hashlib.md5(s.encode()).hexdigest(), 16)
-        return val % mod
+    def _hash_all(self, ids: np.ndarray, seed: int, mod: int) -> np.ndarray:
+        """按 tag-id 批量计算 int(MD5(f"{epc}_{seed}")) % mod (顺序与 ids 对应)，直接写入 int64 数组"""
+        cache = self._md5_cache.setdefault(seed, {})
+        prefixes = self._md5_prefixes
+        seed_bytes = str(seed).encode()
+        def md5_of(i: int) -> int:
+            v = cache.get(i)
+            if v is None:
+                v = cache[i] = _md5_int(prefixes[i], seed_bytes)
+            return v
+        return np.fromiter((md5_of(i) % mod for i in ids.tolist()),
+                           dtype=np.int64, count=len(ids))
 
     def is_finished(self) -> bool:
         return self.is_completed
@@ -153,9 +222,6 @@ class ISMTI_Algorithm(AlgorithmInterface):
             self._start_new_round()
         
         # --- [Step 3] 生成当前时隙指令 ---
-        curr_seed = self.seed
-        curr_f2 = self.f2
-        curr_w = self.w
         curr_slot_idx = self.current_physical_slot
         
         # 计算 Payload (模拟通信开销)
@@ -170,14 +236,12 @@ class ISMTI_Algorithm(AlgorithmInterface):
             payload += self.f2 
 
         # 定义标签响应逻辑 (运行在 Framework 内部)
-        # 只有 "未被验证" 的标签才参与
+        # 只有 "未被验证" 的标签才参与 (分桶中只含未验证标签)
+        # [Sec 5.1.1] Tag computes actual slot index i and bit index j
+        # (_start_new_round 发现已无未验证标签时提前返回，此时会多发一个无人应答的空时隙)
+        slot_bits = self._slot_bits[curr_slot_idx] if curr_slot_idx < len(self._slot_bits) else {}
         def protocol_logic(tag: Tag) -> bool:
-            if tag.epc not in self.unverified_tags:
-                return False
-            # [Sec 5.1.1] Tag computes actual slot index i and bit index j
-            h = self._hash(tag.epc, curr_seed, curr_f2)
-            slot = h // curr_w
-            return slot == curr_slot_idx
+            return tag.epc in slot_bits
 
         self.current_physical_slot += 1
         
@@ -198,12 +262,12 @@ class ISMTI_Algorithm(AlgorithmInterface):
         # 利用框架提供的 Ground Truth (result.tag_ids)
         ideal_response_int = 0
         if result.tag_ids:
+            slot_bits = self._slot_bits[slot_idx]
             for epc in result.tag_ids:
-                h = self._hash(epc, self.seed, self.f2)
-                # 再次确认该标签是否属于当前时隙 (防御性编程)
-                if (h // self.w) == slot_idx:
-                    bit_pos = h % self.w
-                    ideal_response_int |= (1 << bit_pos)
+                # 再次确认该标签是否属于当前时隙 (防御性编程): 不属于则查不到掩码
+                bit = slot_bits.get(epc)
+                if bit:
+                    ideal_response_int |= bit
         
         # 2. 注入信道噪声 (Apply BER)
         # 这里的 noise_mask 来自 framework，1 表示发生了比特翻转
@@ -212,57 +276,59 @@ class ISMTI_Algorithm(AlgorithmInterface):
         
         # 3. 更新 AV (Bit-Tracking)
         # 仅基于 observed_int 更新，这体现了算法对噪声的"无知"
-        for i in range(self.w):
-            if (observed_int >> i) & 1:
-                global_idx = slot_idx * self.w + i
-                if global_idx < self.f2:
-                    self.AV[global_idx] = 1
+        # 时隙 w 位整体移到全局比特偏移 base 处，按 64 位切块 OR 进 AV 字数组；超出 f2 的尾部截掉
+        # 空时隙 (无应答且无翻转) 没有可置位的比特，直接跳过
+        if not observed_int:
+            return
+        base = slot_idx * self.w
+        valid_bits = min(self.w, self.f2 - base)
+        if valid_bits > 0:
+            shifted = (observed_int & ((1 << valid_bits) - 1)) << (base & 63)
+            word = base >> 6
+            while shifted:
+                chunk = shifted & _WORD_MASK
+                if chunk:  # 稀疏应答: 全零的 64 位块不必写回
+                    self.AV[word] |= np.uint64(chunk)
+                shifted >>= 64
+                word += 1
 
     def _analyze_frame_and_update(self):
         """
         [Sec 5.1.2] Missing Tag Identification Phase
         对比 EV 和 AV，应用规则 i-iv，并更新缺失率估计。
         """
-        N_1 = 0   # 期望单标签映射的比特数 (EV=1)
-        N_11 = 0  # 实际观测到的单标签比特数 (EV=1 & AV=1)
-        verified_in_this_round = set()
-        
-        for epc in list(self.unverified_tags):
-            h = self._hash(epc, self.seed, self.f2)
-            
-            ev_val = self.EV[h]
-            av_val = self.AV[h]
-            is_verified = False
-            
-            # [Rule ii] EV=2, AV=0 -> Missing
-            # 意味着本该有多个标签回复，结果全空 -> 全部缺失
-            if ev_val == 2 and av_val == 0:
-                self.missing_tags.add(epc)
-                is_verified = True
-                
-            # [Rule iii] EV=1 -> Determined
-            # 期望只有一个标签回复
-            elif ev_val == 1:
-                if av_val == 1:
-                    # AV=1 -> Present
-                    self.present_tags.add(epc)
-                    N_11 += 1 
-                else:
-                    # AV=0 -> Missing
-                    # (注意：如果是 Noisy 环境，这里可能误判)
-                    self.missing_tags.add(epc)
-                N_1 += 1 
-                is_verified = True
-            
-            # [Rule iv] EV=2, AV=1 -> Undetermined
-            # 期望多个，实际有回复。无法确定具体是谁在场，谁缺失，或者都缺失。
-            # do nothing, keep in unverified_tags
+        # 本轮没有待验证标签 (退化的收尾轮): 无需比对，直接结束
+        if len(self._round_ids) == 0:
+            self.is_completed = True
+            return
 
-            if is_verified:
-                verified_in_this_round.add(epc)
+        # 按本轮 EPC 顺序一次取出每个标签对应比特的 EV / AV 位
+        hw, hs = self._h_word, self._h_shift
+        one = np.uint64(1)
+        single = ((self.EV_one[hw] >> hs) & one).astype(bool)
+        multi = ((self.EV_two[hw] >> hs) & one).astype(bool)
+        av_set = ((self.AV[hw] >> hs) & one).astype(bool)
+        
+        # [Rule iii] EV=1 -> Determined (期望只有一个标签回复)
+        #   AV=1 -> Present; AV=0 -> Missing (注意：如果是 Noisy 环境，这里可能误判)
+        # [Rule ii] EV=2, AV=0 -> Missing
+        #   意味着本该有多个标签回复，结果全空 -> 全部缺失
+        # [Rule iv] EV=2, AV=1 -> Undetermined
+        #   期望多个，实际有回复。无法确定具体是谁在场，谁缺失，或者都缺失。保留在未验证集合
+        is_present = single & av_set
+        is_missing = (single | multi) & ~av_set
+        is_verified = single | is_missing
+        
+        # EV=1 的比特与 EV=1 的标签一一对应，直接在位图上 popcount
+        N_1 = _popcount(self.EV_one)               # 期望单标签映射的比特数 (EV=1)
+        N_11 = _popcount(self.EV_one & self.AV)    # 实际观测到的单标签比特数 (EV=1 & AV=1)
+        
+        ids = self._round_ids
+        self.present_mask[ids[is_present]] = True
+        self.missing_mask[ids[is_missing]] = True
 
         # 移除本轮已验证的标签
-        self.unverified_tags -= verified_in_this_round
+        self.unverified_mask[ids[is_verified]] = False
         
         # [Eq. 23 & 24] Update Missing Rate Estimation
         # q_hat = 1 - (N11 / N1)
@@ -275,4 +341,5 @@ class ISMTI_Algorithm(AlgorithmInterface):
             self.q = 0.0
 
     def get_results(self):
-        return self.present_tags, self.missing_tags
\ No newline at end of file
+        return (set(self._idx_epc[self.present_mask].tolist()),
+                set(self._idx_epc[self.missing_mask].tolist()))
\ No newline at end of file
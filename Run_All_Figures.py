@@ -12,8 +12,12 @@ import sys
 import time
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timedelta
 
+# 并发绘图任务数 (每个任务本身就是独立子进程，这里只需线程负责等待)
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
 # --- 颜色控制 ---
 class Colors:
     HEADER = '\033[95m'
@@ -24,6 +28,19 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
 
+def _iter_pdfs(root, skip_dir):
+    """
+    递归产出 root 下所有 PDF 的 DirEntry (os.scandir 自带类型缓存，无需逐个 stat)。
+    ⚠️ 跳过 skip_dir 自身，防止把已收集的文件再收一遍
+    """
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if os.path.abspath(entry.path) != skip_dir:
+                    yield from _iter_pdfs(entry.path, skip_dir)
+            elif entry.name.lower().endswith(".pdf"):
+                yield entry
+
 def collect_pdfs(source_root="Paper_Figures", target_folder="Paste"):
     """
     收集模块：遍历 source_root 下所有 PDF，复制到 source_root/target_folder
@@ -37,26 +54,37 @@ def collect_pdfs(source_root="Paper_Figures", target_folder="Paste"):
 
     collected_count = 0
     
-    # os.walk 递归遍历
-    for root, dirs, files in os.walk(source_root):
-        # ⚠️ 关键：跳过目标文件夹自身，防止递归死循环
-        if os.path.abspath(root) == os.path.abspath(dest_path):
-            continue
-            
-        for file in files:
-            if file.lower().endswith(".pdf"):
-                src_file = os.path.join(root, file)
-                dst_file = os.path.join(dest_path, file)
-                
-                try:
-                    shutil.copy2(src_file, dst_file) # copy2 保留文件元数据
-                    # print(f"   -> 复制: {file}") #以此减少刷屏，只显示最终结果
-                    collected_count += 1
-                except Exception as e:
-                    print(f"{Colors.FAIL}   -> 复制失败 {file}: {e}{Colors.ENDC}")
+    for entry in _iter_pdfs(source_root, os.path.abspath(dest_path)):
+        dst_file = os.path.join(dest_path, entry.name)
+        try:
+            # copyfile 只复制内容 (Linux 上走 sendfile 内核态拷贝)，不再像 copy2 那样额外同步元数据
+            shutil.copyfile(entry.path, dst_file)
+            collected_count += 1
+        except Exception as e:
+            print(f"{Colors.FAIL}   -> 复制失败 {entry.name}: {e}{Colors.ENDC}")
 
     print(f"{Colors.OKGREEN}✅ 收集完成！共复制了 {collected_count} 个 PDF 文件。{Colors.ENDC}")
 
+def _run_figure(filename):
+    """
+    执行单个绘图脚本 (子进程，环境隔离)，输出被捕获以免并发任务互相刷屏。
+    返回 (文件名, 状态, 耗时, 输出文本)
+    """
+    start_time = time.time()
+    output = ""
+    try:
+        proc = subprocess.run([sys.executable, filename], check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        output = proc.stdout
+        status = "SUCCESS"
+    except subprocess.CalledProcessError as e:
+        output = e.stdout or ""
+        status = "FAILED"
+    except Exception as e:
+        output = str(e)
+        status = "ERROR"
+    return filename, status, time.time() - start_time, output
+
 def run_all():
     current_script = os.path.basename(__file__)
     
@@ -82,33 +110,28 @@ def run_all():
         return
 
     print(f"{Colors.HEADER}{'='*60}")
-    print(f"🚀 开始批量绘图 - 队列: {total_count} 个任务")
+    print(f"🚀 开始批量绘图 - 队列: {total_count} 个任务 (并发: {min(MAX_WORKERS, total_count)})")
     print(f"{'='*60}{Colors.ENDC}\n")
 
     results = []
     start_time_global = time.time()
 
-    # --- 3. 执行绘图 ---
-    for idx, filename in enumerate(target_files, 1):
-        print(f"{Colors.OKBLUE}[{idx}/{total_count}] 执行: {filename} ...{Colors.ENDC}")
-        start_time = time.time()
-        
-        try:
-            # 启动子进程，环境隔离
-            subprocess.run([sys.executable, filename], check=True)
-            status = "SUCCESS"
-            color = Colors.OKGREEN
-        except subprocess.CalledProcessError:
-            status = "FAILED"
-            color = Colors.FAIL
-        except Exception as e:
-            status = "ERROR"
-            color = Colors.FAIL
-            
-        elapsed = time.time() - start_time
-        results.append((filename, status, elapsed))
-        print(f"{color}   -> {status} ({elapsed:.2f}s){Colors.ENDC}")
-        print("-" * 40)
+    # --- 3. 并发执行绘图 (按完成顺序汇报) ---
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, total_count)) as executor:
+        futures = [executor.submit(_run_figure, f) for f in target_files]
+        for idx, fut in enumerate(as_completed(futures), 1):
+            filename, status, elapsed, output = fut.result()
+            color = Colors.OKGREEN if status == "SUCCESS" else Colors.FAIL
+            results.append((filename, status, elapsed))
+            print(f"{Colors.OKBLUE}[{idx}/{total_count}] 完成: {filename}{Colors.ENDC}")
+            if status != "SUCCESS":
+                # 仅失败任务回显其输出，便于定位
+                print(output.rstrip())
+            print(f"{color}   -> {status} ({elapsed:.2f}s){Colors.ENDC}")
+            print("-" * 40)
+
+    # 摘要按文件名排列，与队列顺序一致
+    results.sort()
 
     # --- 4. 统计与报告 ---
     success_count = sum(1 for r in results if r[1] == "SUCCESS")
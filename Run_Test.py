@@ -13,6 +13,8 @@ Run_Test.py
 import time
 import random
 import logging
+import multiprocessing as mp
+import numpy as np
 import pandas as pd
 from typing import List, Dict, Optional
 
@@ -24,6 +26,8 @@ from framework import (
     AlgorithmInterface
 )
 
+from Tool import resolve_max_workers
+
 # --- 导入配置中心 ---
 from Algorithm_Config import ALGORITHM_LIBRARY
 
@@ -34,6 +38,25 @@ RUN_TEST = ['LODS_MTI']
 ROUND_COUNT = 100         # 测试总轮次
 TEST_TAGS = 500          # 标签数量
 TEST_MISSING_RATE = 0.5  # 缺失率
+TEST_ENVS = ("Ideal", "Noisy")  # 每轮依次测试的物理环境
+
+# 各轮次相互独立 (各自重置 random.seed)，进程数与实验脚本一致 (可通过环境变量 LODS_MAX_WORKERS 手动指定)
+MAX_WORKERS = resolve_max_workers()
+
+# 汇总记录: 预分配的结构化数组 (每个用例一行)，仅在出报表时转为 DataFrame
+RESULT_DTYPE = np.dtype([
+    ('algo', 'U32'), ('env', 'U8'), ('round', 'i4'), ('passed', '?'),
+    ('ms', 'f8'), ('eff', 'f8'), ('tput', 'f8'),
+])
+# 结构化字段 -> 报表列名
+RESULT_COLUMNS = {
+    'algo': '算法', 'env': '环境', 'round': '轮次', 'passed': '是否通过',
+    'ms': '耗时(ms)', 'eff': '效率(tags/slot)', 'tput': '吞吐量',
+}
+
+# 进程内算法实例缓存: (算法, 标签数, 缺失率) -> 实例。
+# 同一配置下期望 EPC 全集相同，提供 reset() 的算法可跳过重新初始化
+_ALGO_CACHE: Dict[tuple, AlgorithmInterface] = {}
 
 # 日志配置
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', datefmt='%H:%M:%S')
@@ -42,10 +65,28 @@ logger = logging.getLogger(__name__)
 logging.getLogger('framework').setLevel(logging.WARNING)
 
 class AlgorithmTester:
-    def __init__(self):
-        self.results_summary = []
+    def __init__(self, capacity: Optional[int] = None):
+        if capacity is None:
+            capacity = ROUND_COUNT * len(RUN_TEST) * len(TEST_ENVS)
+        self._results = np.empty(capacity, dtype=RESULT_DTYPE)
+        self._n_results = 0
         self.failed_cases = [] # 专门存储失败的案例详情
 
+    @property
+    def results_summary(self) -> np.ndarray:
+        """已记录的汇总行 (结构化数组视图)"""
+        return self._results[:self._n_results]
+
+    def add_results(self, rows: np.ndarray):
+        """并入其它 tester (如工作进程) 产生的汇总行，容量不足时按倍数扩容"""
+        end = self._n_results + len(rows)
+        if end > len(self._results):
+            grown = np.empty(max(end, 2 * len(self._results)), dtype=RESULT_DTYPE)
+            grown[:self._n_results] = self.results_summary
+            self._results = grown
+        self._results[self._n_results:end] = rows
+        self._n_results = end
+
     def generate_scenario(self, total_tags: int, missing_rate: float, seed: int) -> List[Tag]:
         """
         生成符合 Hash 计算要求的 Hex EPC 标签
@@ -118,9 +159,16 @@ class AlgorithmTester:
         ground_truth_missing = {t.epc for t in scenario_tags if not t.is_present}
         
         # --- 4. 初始化算法 ---
+        cache_key = (algo_key, total_tags, missing_rate)
         try:
-            algo_instance = algo_class(**algo_params)
-            algo_instance.initialize(scenario_tags)
+            algo_instance = _ALGO_CACHE.get(cache_key)
+            if algo_instance is not None:
+                algo_instance.reset()
+            else:
+                algo_instance = algo_class(**algo_params)
+                algo_instance.initialize(scenario_tags)
+                if hasattr(algo_instance, 'reset'):
+                    _ALGO_CACHE[cache_key] = algo_instance
         except Exception as e:
             logger.error(f"{log_prefix} ❌ 初始化失败: {e}")
             return
@@ -187,19 +235,15 @@ class AlgorithmTester:
             logger.info(f"{log_prefix} {status_icon} 通过 | 耗时: {total_time_s*1000:.1f}ms | 效率: {id_efficiency:.3f}")
 
         # 添加到总表
-        self.results_summary.append({
-            "算法": algo_key,
-            "环境": env_type,
-            "轮次": round_idx + 1,
-            "是否通过": 1 if is_pass else 0,
-            "耗时(ms)": total_time_s * 1000,
-            "效率(tags/slot)": id_efficiency,
-            "吞吐量": throughput
-        })
+        self.add_results(np.array(
+            [(algo_key, env_type, round_idx + 1, is_pass,
+              total_time_s * 1000, id_efficiency, throughput)],
+            dtype=RESULT_DTYPE
+        ))
 
     def print_summary(self):
-        if not self.results_summary: return
-        df = pd.DataFrame(self.results_summary)
+        if self._n_results == 0: return
+        df = pd.DataFrame(self.results_summary).rename(columns=RESULT_COLUMNS)
         
         print("\n" + "="*100)
         print("                                   测试结果报告 (Summary)                                   ")
@@ -244,41 +288,47 @@ class AlgorithmTester:
         print(summary_df[final_cols].to_string(index=False))
         print("="*100 + "\n")
 
+def _run_one(args):
+    """
+    进程池工作函数: 在独立的 AlgorithmTester 中跑一个 (轮次, 种子, 算法, 环境) 用例，
+    返回该用例产生的 (汇总行 (结构化数组), 失败案例列表)，由主进程合并。
+    """
+    round_i, seed, algo, env_type = args
+    tester = AlgorithmTester(capacity=1)
+    tester.run_single_test(
+        round_idx=round_i,
+        seed=seed,
+        algo_key=algo,
+        total_tags=TEST_TAGS,
+        missing_rate=TEST_MISSING_RATE,
+        env_type=env_type
+    )
+    return tester.results_summary, tester.failed_cases
+
 if __name__ == "__main__":
     tester = AlgorithmTester()
     
     print(f"🚀 启动鲁棒性循环测试 (Robustness Loop Test)")
     print(f"🎯 算法: {RUN_TEST}")
-    print(f"⚙️  设置: 标签数={TEST_TAGS}, 缺失率={TEST_MISSING_RATE}, 轮次={ROUND_COUNT}\n")
+    print(f"⚙️  设置: 标签数={TEST_TAGS}, 缺失率={TEST_MISSING_RATE}, 轮次={ROUND_COUNT}, 进程数={MAX_WORKERS}\n")
 
     start_all = time.time()
 
-    # --- 10轮 循环 ---
-    for round_i in range(ROUND_COUNT):
-        # 每一轮使用一个基准种子
-        # 这样能保证这一轮里的 "Ideal" 和 "Noisy" 面对的是同一个标签分布（虽然random.seed会重置）
-        current_seed = 2024 + round_i 
-        
-        for algo in RUN_TEST:
-            # 1. 理想环境测试
-            tester.run_single_test(
-                round_idx=round_i,
-                seed=current_seed, 
-                algo_key=algo, 
-                total_tags=TEST_TAGS, 
-                missing_rate=TEST_MISSING_RATE, 
-                env_type="Ideal"
-            )
-            
-            # 2. 噪声环境测试
-            tester.run_single_test(
-                round_idx=round_i,
-                seed=current_seed, 
-                algo_key=algo, 
-                total_tags=TEST_TAGS, 
-                missing_rate=TEST_MISSING_RATE, 
-                env_type="Noisy"
-            )
+    # --- 多轮 循环 (展开为独立用例，并行执行) ---
+    # 每一轮使用一个基准种子
+    # 这样能保证这一轮里的 "Ideal" 和 "Noisy" 面对的是同一个标签分布（虽然random.seed会重置）
+    tasks = [(round_i, 2024 + round_i, algo, env_type)
+             for round_i in range(ROUND_COUNT)
+             for algo in RUN_TEST
+             for env_type in TEST_ENVS]
+
+    with mp.Pool(processes=min(MAX_WORKERS, len(tasks))) as pool:
+        for summary, failed in pool.imap_unordered(_run_one, tasks):
+            tester.add_results(summary)
+            tester.failed_cases.extend(failed)
+
+    # 完成顺序不确定，失败案例按轮次排序便于查阅
+    tester.failed_cases.sort(key=lambda c: (c["轮次"], c["算法"], c["环境"]))
             
     print(f"⏳ 测试总耗时: {time.time() - start_all:.2f}s")
     
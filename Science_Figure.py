@@ -13,11 +13,22 @@ Science_Figure.py
 
 import os
 import math
+from functools import lru_cache
+from types import MappingProxyType
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
+import matplotlib.ticker as ticker
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from typing import List, Dict, Tuple, Any
 
+try:
+    import pyarrow  # noqa: F401  可选依赖: 多线程 CSV 解析器，数值宽表解析更快
+    _CSV_ENGINE = 'pyarrow'
+except ImportError:
+    _CSV_ENGINE = 'c'
+
 # --- 导入配置中心 ---
 try:
     from Algorithm_Config import ALGORITHM_LIBRARY, PLOT_STYLE_PALETTE
@@ -56,6 +67,11 @@ LAYOUT_CONFIG = {
     'LABEL_POS': (-0.22, 1.05), # 子图编号 (a) 的位置 (相对于子图 Axes 坐标)
 }
 
+@lru_cache(maxsize=32)
+def _read_csv_cached(csv_path: str, mtime_ns: int) -> pd.DataFrame:
+    """按 (路径, 修改时间) 缓存解析结果: 同一文件在多张图/多个布局间复用，文件被改写后自动失效"""
+    return pd.read_csv(csv_path, engine=_CSV_ENGINE)
+
 # ==============================================================================
 # 1. 全局样式配置
 # ==============================================================================
@@ -83,10 +99,20 @@ def apply_science_style():
 # 2. 核心绘图类
 # ==============================================================================
 class SciencePlotter:
-    def __init__(self, output_dir="figures_pub"):
+    _style_applied = False  # rcParams 为进程级全局状态，只需设置一次
+
+    def __init__(self, output_dir="figures_pub", png_dpi: int = 300):
         self.output_dir = output_dir
+        # PNG 仅作预览 (论文收录的是 PDF)，只需快速预览时可调低，如 150
+        self.png_dpi = png_dpi
         os.makedirs(self.output_dir, exist_ok=True)
-        apply_science_style()
+        if not SciencePlotter._style_applied:
+            apply_science_style()
+            SciencePlotter._style_applied = True
+        # 画布池: 画布尺寸 -> Figure。同尺寸布局的后续调用只需 clf() 复用，省去重建画布/canvas 的开销
+        self._fig_pool: Dict[Tuple[float, float], Figure] = {}
+        # (样式号, 图例文本) -> 只读样式字典，多子图/多张图共享同一份，不再逐条曲线复制调色板
+        self._style_cache: Dict[Tuple[int, str], MappingProxyType] = {}
         
         self.metric_label_map = {
             'throughput': 'System Throughput (tags/s)',
@@ -102,12 +128,18 @@ class SciencePlotter:
             'time_efficiency_index': 'Normalized Time Efficiency'
         }
 
-    def _get_style_by_id(self, style_id: int, label_txt: str) -> Dict:
+    def _get_style_by_id(self, style_id: int, label_txt: str) -> MappingProxyType:
+        key = (style_id, label_txt)
+        style = self._style_cache.get(key)
+        if style is not None:
+            return style
         if not PLOT_STYLE_PALETTE:
-             return {"color": "black", "linestyle": "-", "marker": "o", "label": label_txt}
-        safe_id = style_id % len(PLOT_STYLE_PALETTE)
-        style = PLOT_STYLE_PALETTE[safe_id].copy()
-        style['label'] = label_txt
+            style = {"color": "black", "linestyle": "-", "marker": "o", "label": label_txt}
+        else:
+            safe_id = style_id % len(PLOT_STYLE_PALETTE)
+            style = PLOT_STYLE_PALETTE[safe_id].copy()
+            style['label'] = label_txt
+        style = self._style_cache[key] = MappingProxyType(style)
         return style
 
     def _resolve_algo_styles(self, algo_list: List[str], highlight_target: str = None) -> Dict[str, int]:
@@ -133,11 +165,32 @@ class SciencePlotter:
             current_id += 1
         return style_map
 
+    def _acquire_figure(self, fig_size: Tuple[float, float]) -> Figure:
+        """
+        从画布池取出指定尺寸的 Figure (已清空)，没有则新建。
+        直接使用面向对象的 Figure + Agg 画布，不经过 pyplot 状态机 (不登记到 Gcf，也无需 plt.close)
+        """
+        fig = self._fig_pool.get(fig_size)
+        if fig is None:
+            fig = self._fig_pool[fig_size] = Figure(figsize=fig_size)
+            FigureCanvasAgg(fig)
+        else:
+            fig.clf()
+        return fig
+
+    def close(self):
+        """释放画布池中的所有 Figure"""
+        self._fig_pool.clear()
+
     def _load_data(self, csv_path: str) -> pd.DataFrame:
-        if not os.path.exists(csv_path):
+        # 一次 stat 同时完成存在性检查与缓存键 (mtime) 获取
+        try:
+            mtime_ns = os.stat(csv_path).st_mtime_ns
+        except OSError:
             print(f"⚠️ 警告: 文件未找到 -> {csv_path}")
             return pd.DataFrame()
-        return pd.read_csv(csv_path)
+        # 返回副本，调用方改动不会污染缓存
+        return _read_csv_cached(csv_path, mtime_ns).copy()
 
     # --------------------------------------------------------------------------
     # [核心] 绝对几何计算引擎
@@ -210,14 +263,19 @@ class SciencePlotter:
     def draw_scientific_figure(self, 
                                tasks: List[Dict], 
                                layout_type: str = "single", 
-                               filename: str = "fig_output"):
+                               filename: str = "fig_output",
+                               formats: Tuple[str, ...] = ("pdf", "png")):
+        """
+        formats: 需要输出的文件格式。每种格式都要完整重绘一遍画布，
+                 只需预览图时传 ("png",) 可省去 PDF 渲染
+        """
         
         # 1. 获取绝对几何参数
         # fig_size 是 (宽inch, 高inch)
         fig_size, axes_rects, legend_y = self._calc_absolute_geometry(layout_type)
         total_h_inch = fig_size[1] # 获取画布总高度，用于计算比例
         
-        fig = plt.figure(figsize=fig_size)
+        fig = self._acquire_figure(fig_size)
         
         axes_list = []
         legend_handles = {}
@@ -229,6 +287,9 @@ class SciencePlotter:
             
             # 使用 add_axes 精确放置
             ax = fig.add_axes(rect)
+            # 本引擎不画次刻度: 显式置空次刻度定位器，即使外部样式开启了 minor ticks 也不会生成多余的 Tick 对象
+            ax.xaxis.set_minor_locator(ticker.NullLocator())
+            ax.yaxis.set_minor_locator(ticker.NullLocator())
             axes_list.append(ax)
             
             task = tasks[idx]
@@ -239,20 +300,26 @@ class SciencePlotter:
             
             # 样式与绘图
             mark_step = task.get('mark_step', 1) 
-            exclude_cols = task.get('exclude', [])
-            algo_cols = [c for c in df.columns if c != x_col and c not in exclude_cols]
+            exclude_cols = frozenset(task.get('exclude', ())) | {x_col}
+            algo_cols = [c for c in df.columns if c not in exclude_cols]
             
             highlight_target = task.get('highlight', None)
             style_map = self._resolve_algo_styles(algo_cols, highlight_target)
-            algo_cols.sort(key=lambda x: style_map.get(x, 99))
+            # style_map 覆盖 algo_cols 中的每个算法，可直接按键取样式号排序
+            algo_cols.sort(key=style_map.__getitem__)
 
+            # 各算法样式 (线型/标记/zorder) 互不相同，无法合并为同一 LineCollection；
+            # 改为一次性取出 ndarray 传给 ax.plot，跳过 matplotlib 对 pandas Series 的逐次单位转换
+            x_vals = df[x_col].to_numpy()
+            # 同一子图内各曲线共用 x 网格: 标记点下标只算一次，所有曲线共享同一 slice
+            mark_idx = slice(0, None, mark_step) if isinstance(mark_step, int) else mark_step
             for algo_name in algo_cols:
                 sid = style_map.get(algo_name)
                 conf = ALGORITHM_LIBRARY.get(algo_name, {})
                 label_txt = conf.get('label', algo_name)
                 style = self._get_style_by_id(sid, label_txt)
                 
-                line, = ax.plot(df[x_col], df[algo_name], markevery=mark_step, **style)
+                line, = ax.plot(x_vals, df[algo_name].to_numpy(), markevery=mark_idx, **style)
                 
                 if style['label'] not in legend_handles:
                     legend_handles[style['label']] = line
@@ -341,17 +408,25 @@ class SciencePlotter:
                     text.set_fontweight('bold')
 
         # 4. 保存 (不使用 tight_layout)
-        pdf_path = os.path.join(self.output_dir, f"{filename}.pdf")
-        png_path = os.path.join(self.output_dir, f"{filename}.png")
-        
         # ⚠️ 关键：不使用 bbox_inches='tight' 来保存 PDF，以保留我们精心计算的留白
         # 但 PNG 为了展示方便可以使用，或者保持一致。
         # 为了“绝对一致性”，建议 PDF 不使用 tight，PNG 使用。
-        plt.savefig(pdf_path, format='pdf') 
-        plt.savefig(png_path, format='png', dpi=300)
+        saved_paths = []
+        for fmt in formats:
+            out_path = os.path.join(self.output_dir, f"{filename}.{fmt}")
+            if fmt == 'png':
+                # zlib 压缩级别 1: 像素无损，编码比默认级别快数倍，文件略大
+                fig.savefig(out_path, format='png', dpi=self.png_dpi, pil_kwargs={'compress_level': 1})
+            elif fmt == 'pdf':
+                # 去掉创建时间戳: 相同数据重复出图得到逐字节一致的 PDF
+                fig.savefig(out_path, format='pdf', metadata={'CreationDate': None})
+            else:
+                fig.savefig(out_path, format=fmt)
+            saved_paths.append(out_path)
         
-        print(f"✅ 图表已生成 (Layout: {layout_type}, Size: {fig_size[0]:.1f}x{fig_size[1]:.1f}\"): {pdf_path}")
-        plt.close()
+        if saved_paths:
+            print(f"✅ 图表已生成 (Layout: {layout_type}, Size: {fig_size[0]:.1f}x{fig_size[1]:.1f}\"): {saved_paths[0]}")
+        # 不关闭画布: 留在池中供下一次同尺寸调用复用 (由 close() 统一释放)
 
 if __name__ == "__main__":
     print("Science_Figure V10.0: Absolute Geometry Engine Ready.")
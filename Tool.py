@@ -10,10 +10,19 @@ Tool.py - RFID Simulation Analytics & Visualization Toolkit
 """
 
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import os
 import math
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from framework import SimulationConfig
+
+try:
+    import psutil  # 可选依赖: 用于识别物理核数
+except ImportError:
+    psutil = None
 
 # 尝试设置中文字体
 try:
@@ -22,22 +31,138 @@ try:
 except: 
     pass
 
+def default_workers() -> int:
+    """
+    CPU 密集型仿真按物理核数开进程 (超线程对纯 Python 计算几乎无收益，反而加剧缓存争用)。
+    Slurm 作业优先遵守分配的核数；taskset / 容器 cpuset 限定的可用 CPU 数作为上限。
+    """
+    cores = int(os.environ.get('SLURM_CPUS_ON_NODE', 0))
+    if not cores and psutil is not None:
+        cores = psutil.cpu_count(logical=False) or 0
+    if not cores:
+        cores = max(1, (os.cpu_count() or 2) // 2)
+    if hasattr(os, 'sched_getaffinity'):
+        cores = min(cores, len(os.sched_getaffinity(0)))
+    return max(1, cores - 1)
+
+def resolve_max_workers() -> int:
+    """进程池大小: 环境变量 LODS_MAX_WORKERS 可手动指定，未设置时取 default_workers()"""
+    return int(os.environ.get('LODS_MAX_WORKERS', 0)) or default_workers()
+
+# 父进程生成的最大规模 EPC 表 (由 init_epc_worker 注入)；较小规模的 EPC 列表恰为其前缀
+_EPC_TABLE: Tuple[str, ...] = ()
+
+def init_epc_worker(epc_table: Tuple[str, ...]) -> None:
+    """进程池 initializer: 接收父进程生成的 EPC 表，worker 内不再重复 format"""
+    global _EPC_TABLE
+    _EPC_TABLE = epc_table
+
+@lru_cache(maxsize=None)
+def build_base_tags(n_tags: int) -> Tuple[str, ...]:
+    """同一规模的 EPC 列表在所有任务间相同，每个 worker 每种规模只生成一次"""
+    if len(_EPC_TABLE) >= n_tags:
+        return _EPC_TABLE[:n_tags]
+    return tuple(format(0xE2000000 + i, '024X') for i in range(n_tags))
+
+@lru_cache(maxsize=1024)
+def build_permutation(n_tags: int, seed: int) -> np.ndarray:
+    """seed 决定的洗牌排列 (只读)，同一 (规模, seed) 在各算法变体 / 参数点间复用"""
+    perm = np.random.default_rng(seed).permutation(n_tags)
+    perm.flags.writeable = False
+    return perm
+
+@lru_cache(maxsize=256)
+def cached_sim_config(**params) -> SimulationConfig:
+    """相同参数共享一个配置对象 (仿真过程只读，按引用复用是安全的)"""
+    return SimulationConfig(**params)
+
+def _safe_ratio(num: pd.Series, den: pd.Series) -> np.ndarray:
+    """逐元素 num / den，分母不为正 (含 NaN) 处取 0"""
+    num = num.to_numpy(dtype=float)
+    den = den.to_numpy(dtype=float)
+    out = np.zeros(len(den))
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+def _grouped_means(df: pd.DataFrame, x_key: str, metric_cols: List[str]):
+    """
+    按 (x_key, algorithm_name) 对所有指标列求均值 (跳过 NaN，分组键为空的行不参与)。
+    键映射为稠密下标后用 bincount 直接累加 和/计数，不构造中间分组表。
+    返回 (mean[nx, na, nm], x 轴索引, 算法列索引)；与 pandas groupby.mean 仅有末位舍入差异
+    (后者使用补偿求和)。
+    """
+    keys_ok = df[x_key].notna().to_numpy() & df['algorithm_name'].notna().to_numpy()
+    sub = df.loc[keys_ok]
+    xs, xi = np.unique(sub[x_key].to_numpy(), return_inverse=True)
+    algos, ai = np.unique(sub['algorithm_name'].to_numpy(), return_inverse=True)
+    n_groups = len(xs) * len(algos)
+    flat = xi * len(algos) + ai
+
+    vals = sub[metric_cols].to_numpy(dtype=float)
+    means = np.empty((n_groups, len(metric_cols)))
+    for j in range(len(metric_cols)):
+        valid = ~np.isnan(vals[:, j])
+        sums = np.bincount(flat[valid], weights=vals[valid, j], minlength=n_groups)
+        cnts = np.bincount(flat[valid], minlength=n_groups)
+        with np.errstate(invalid='ignore'):
+            means[:, j] = sums / cnts  # 无有效值的组得到 NaN
+    return (means.reshape(len(xs), len(algos), len(metric_cols)),
+            pd.Index(xs, name=x_key), pd.Index(algos, name='algorithm_name'))
+
 class SimulationAnalytics:
     def __init__(self):
-        self.raw_data = []
+        self._frame = None  # from_dataframe 注入的整表
+        self._columns: Dict[str, List] = {}  # 列式 (SoA) 结果缓冲: 列名 -> 值列表，所有收集入口共用
+        self._n_soa = 0
+        # 派生指标表缓存 (save_to_csv / plot_results 共用)，以已收集的行数为键
+        self._derived = None
+        self._derived_key = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'SimulationAnalytics':
+        """由驱动脚本一次性汇总好的结果表构造 (列与 add_run_result 的记录一致)"""
+        analytics = cls()
+        analytics._frame = df
+        return analytics
 
     def add_run_result(self, result_stats: Dict, sim_config: Dict, algo_name: str, run_id: int):
-        """收集单次运行结果"""
-        record = {
+        """收集单次运行结果 (合并为一行后写入列式缓冲)"""
+        self.add_run_result_soa({
             'algorithm_name': algo_name,
             'run_id': run_id,
             **sim_config,
             **result_stats
-        }
-        self.raw_data.append(record)
+        })
+
+    def add_run_result_soa(self, col_dict: Dict):
+        """
+        列式收集单次运行结果 (SoA)
+        col_dict 为一行的 {列名: 标量}，追加到各列的平行列表；
+        缺失的列用 NaN 补齐，保证所有列等长
+        """
+        cols = self._columns
+        n = self._n_soa
+        for key, val in col_dict.items():
+            col = cols.get(key)
+            if col is None:
+                col = cols[key] = [np.nan] * n
+            col.append(val)
+        n += 1
+        for col in cols.values():
+            if len(col) < n:
+                col.append(np.nan)
+        self._n_soa = n
+        self._derived = None
 
     def get_dataframe(self) -> pd.DataFrame:
-        return pd.DataFrame(self.raw_data) if self.raw_data else pd.DataFrame()
+        frames = [f for f in (self._frame,) if f is not None]
+        if self._n_soa:
+            # 直接由列构造，各列独立推断类型 (含 NaN 补齐的字符串列仍为 object，不会被转成 'nan' 字符串)
+            frames.append(pd.DataFrame(self._columns))
+        if not frames:
+            return pd.DataFrame()
+        # 后续会原地追加派生列，不能改动调用方传入的表
+        return frames[0].copy() if len(frames) == 1 else pd.concat(frames, ignore_index=True)
 
     def _calculate_derived_metrics(self, df: pd.DataFrame) -> pd.DataFrame:
         """[计算层] 计算所有深度指标"""
@@ -53,34 +178,23 @@ class SimulationAnalytics:
         df['total_energy_j'] = reader_e_j + tag_e_j
         
         # --- 2. 深度指标 ---
+        # 整列向量化计算；分母 <= 0 (或 NaN) 时记为 0，与逐行判断的语义一致
         # Verification Concurrency
         if 'TOTAL_TAGS' in df.columns and 'total_slots' in df.columns:
-            df['verification_concurrency'] = df.apply(
-                lambda r: r['TOTAL_TAGS'] / r['total_slots'] if r['total_slots'] > 0 else 0, 
-                axis=1
-            )
+            df['verification_concurrency'] = _safe_ratio(df['TOTAL_TAGS'], df['total_slots'])
 
         # Energy Cost Per Tag
         if 'TOTAL_TAGS' in df.columns:
-            df['energy_per_tag_uj'] = df.apply(
-                lambda r: (r['total_energy_j'] * 1e6) / r['TOTAL_TAGS'] if r['TOTAL_TAGS'] > 0 else 0,
-                axis=1
-            )
+            df['energy_per_tag_uj'] = _safe_ratio(df['total_energy_j'] * 1e6, df['TOTAL_TAGS'])
 
         # Time Efficiency Index
         t_min_ms = 0.4 
         if 'TOTAL_TAGS' in df.columns and 'total_time_ms' in df.columns:
-            df['time_efficiency_index'] = df.apply(
-                lambda r: (r['TOTAL_TAGS'] * t_min_ms) / r['total_time_ms'] if r['total_time_ms'] > 0 else 0,
-                axis=1
-            )
+            df['time_efficiency_index'] = _safe_ratio(df['TOTAL_TAGS'] * t_min_ms, df['total_time_ms'])
 
         # Throughput
         if 'TOTAL_TAGS' in df.columns and 'total_time_s' in df.columns:
-            df['throughput'] = df.apply(
-                lambda r: r['TOTAL_TAGS'] / r['total_time_s'] if r['total_time_s'] > 0 else 0, 
-                axis=1
-            )
+            df['throughput'] = _safe_ratio(df['TOTAL_TAGS'], df['total_time_s'])
             
         # EDP
         if 'total_energy_j' in df.columns and 'total_time_s' in df.columns:
@@ -88,22 +202,26 @@ class SimulationAnalytics:
 
         # Collision Rate
         if 'collision_slots' in df.columns and 'total_slots' in df.columns:
-            df['collision_rate'] = df.apply(
-                lambda r: r['collision_slots'] / r['total_slots'] if r['total_slots'] > 0 else 0,
-                axis=1
-            )
+            df['collision_rate'] = _safe_ratio(df['collision_slots'], df['total_slots'])
 
         return df
 
+    def _get_derived(self) -> pd.DataFrame:
+        """带缓存的 get_dataframe + _calculate_derived_metrics；数据未变时直接复用上次结果 (调用方只读)"""
+        key = self._n_soa
+        if self._derived is None or self._derived_key != key:
+            self._derived = self._calculate_derived_metrics(self.get_dataframe())
+            self._derived_key = key
+        return self._derived
+
     def save_to_csv(self, x_axis_key: str, output_dir: str = "simulation_results"):
         """
         [存储层] 自动拆分所有指标为单独 CSV
         """
-        if not self.raw_data: return
+        # 1. 计算全量数据 (含派生指标)
+        df = self._get_derived()
+        if df.empty: return
         os.makedirs(output_dir, exist_ok=True)
-        
-        # 1. 计算全量数据
-        df = self._calculate_derived_metrics(self.get_dataframe())
 
         # 2. 保存总表 (备份用)
         full_path = os.path.join(output_dir, "00_Raw_Full_Data.csv")
@@ -125,35 +243,40 @@ class SimulationAnalytics:
         ]
         
         # 筛选出所有数值类型的列作为待拆分指标
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        metric_cols = [c for c in numeric_cols if c not in exclude_cols]
+        # 与 select_dtypes(include='number') 一致: 数值列，不含布尔列
+        is_num = pd.api.types.is_numeric_dtype
+        is_bool = pd.api.types.is_bool_dtype
+        numeric_mask = np.fromiter((is_num(t) and not is_bool(t) for t in df.dtypes), dtype=bool, count=df.shape[1])
+        exclude = frozenset(exclude_cols)
+        metric_cols = [c for c in df.columns[numeric_mask] if c not in exclude]
+
+        # 分组键必须存在；缺失时直接报错，而不是在拆分循环里被静默吞掉
+        missing_keys = [k for k in (x_axis_key, 'algorithm_name') if k not in df.columns]
+        if missing_keys:
+            raise KeyError(f"save_to_csv 缺少分组列: {missing_keys}")
         
         print(f"🔄 正在自动拆分 {len(metric_cols)} 个性能指标...")
 
+        # 核心逻辑: 一次累加求出所有指标的均值，再逐指标取出
+        # 将多轮实验(run_id)的数据取平均值，转置为 [X轴, 算法A, 算法B...] 的宽表格式
+        means, x_index, algo_index = _grouped_means(df, x_axis_key, metric_cols)
+
         count = 0
-        for col in metric_cols:
-            try:
-                # 核心逻辑: 透视表 (Pivot)
-                # 将多轮实验(run_id)的数据取平均值，转置为 [X轴, 算法A, 算法B...] 的宽表格式
-                pivot = df.pivot_table(
-                    index=x_axis_key, 
-                    columns='algorithm_name', 
-                    values=col, 
-                    aggfunc='mean'
-                )
-                
-                # 重置索引，让 x_axis_key 变回普通列，这对绘图脚本至关重要
-                pivot.reset_index(inplace=True)
-                
-                # 生成规范文件名: raw_{指标名}.csv
-                # 替换非法字符
-                safe_name = col.replace("/", "_").replace(" ", "_").replace("(", "").replace(")", "")
-                fname = f"raw_{safe_name}.csv"
-                
-                pivot.to_csv(os.path.join(output_dir, fname), index=False)
-                count += 1
-            except Exception as e:
-                pass # 忽略无法聚合的列
+        for j, col in enumerate(metric_cols):
+            # 与 pivot_table(dropna=True) 一致: 去掉全空的行/列
+            pivot = pd.DataFrame(means[:, :, j], index=x_index, columns=algo_index)
+            pivot = pivot.dropna(how='all').dropna(axis=1, how='all')
+            
+            # 重置索引，让 x_axis_key 变回普通列，这对绘图脚本至关重要
+            pivot.reset_index(inplace=True)
+            
+            # 生成规范文件名: raw_{指标名}.csv
+            # 替换非法字符
+            safe_name = col.replace("/", "_").replace(" ", "_").replace("(", "").replace(")", "")
+            fname = f"raw_{safe_name}.csv"
+            
+            pivot.to_csv(os.path.join(output_dir, fname), index=False)
+            count += 1
 
         print(f"✅ 拆分完成，已生成 {count} 个独立指标文件 (raw_*.csv)。")
 
@@ -161,12 +284,10 @@ class SimulationAnalytics:
         """
         [展示层] 仅绘制精选的深度指标
         """
-        df = self.get_dataframe()
+        # 必须先计算指标 (与 save_to_csv 共用缓存)
+        df = self._get_derived()
         if df.empty: return
         
-        # 必须先计算指标
-        df = self._calculate_derived_metrics(df)
-        
         # --- 核心配置：展示哪些指标 (KPI Map) ---
         # Key: 图表标题
         # Value: DataFrame 中的列名
@@ -208,6 +329,8 @@ class SimulationAnalytics:
         else: axes = axes.flatten()
         
         algos = sorted(df['algorithm_name'].unique())
+        # 一次分组求出所有 KPI 在 (算法, X轴) 上的均值，循环内只做索引切片
+        grp = df.groupby(['algorithm_name', x_axis_key])[list(valid_kpis.values())].mean().sort_index()
 
         for idx, (title, col) in enumerate(valid_kpis.items()):
             ax = axes[idx]
@@ -230,9 +353,8 @@ class SimulationAnalytics:
                         style_kwargs['markersize'] = 9
                         style_kwargs['zorder'] = 10
                     
-                subset = df[df['algorithm_name'] == algo]
-                # 按 X 轴分组求均值
-                grouped = subset.groupby(x_axis_key)[col].mean().sort_index()
+                # 该算法按 X 轴的均值曲线
+                grouped = grp.loc[algo, col]
                 
                 # 绘图
                 ax.plot(grouped.index, grouped.values, label=algo, **style_kwargs)
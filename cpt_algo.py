@@ -5,6 +5,7 @@ cpt_algo.py
 
 import math
 import hashlib
+import numpy as np
 from collections import deque
 from typing import List, Dict, Tuple, Set, Optional
 from framework import (
@@ -17,8 +18,8 @@ from framework import (
 
 class CPT_Node:
     """CPT树节点结构"""
-    def __init__(self, tags: List[str], parent=None):
-        self.tags = tags            
+    def __init__(self, indices: np.ndarray, parent=None):
+        self.indices = indices      # 节点内标签在 bitmat 中的行号
         self.bit_index = -1         
         self.left: Optional[CPT_Node] = None
         self.right: Optional[CPT_Node] = None
@@ -30,16 +31,22 @@ class CPT_Algorithm(AlgorithmInterface):
         self.initial_pid_len = pseudo_id_len
         self.pseudo_ids: Dict[str, str] = {} 
         self.pid_length = 0
+        # 伪 ID 位矩阵 (N x pid_length, 每格 0/1)，行号与 expected_tags 顺序一致
+        self.bitmat = np.empty((0, 0), dtype=np.uint8)
+        self.epc_to_row: Dict[str, int] = {}
+        self._row_epc = np.empty(0, dtype=object)
+        # 伪 ID 按二进制打包成整数，字符串下标 b 对应整数位 pid_length-1-b
+        self._pid_int: Dict[str, int] = {}
         self.leaves: List[CPT_Node] = []
         self.current_leaf_idx = 0
         self.last_leaf_node: Optional[CPT_Node] = None 
         self.finished = False  
-        self.present_tags = set()
+        # 在场标记按 bitmat 行号存放；缺失 = 未被确认在场的预期标签
+        self.present_mask = np.zeros(0, dtype=bool)
         self.all_expected_epcs = set()
 
     def initialize(self, expected_tags: List[Tag]):
         self.all_expected_epcs = {t.epc for t in expected_tags}
-        self.present_tags.clear()
         self.finished = False
         self.current_leaf_idx = 0
         self.leaves = []
@@ -50,14 +57,20 @@ class CPT_Algorithm(AlgorithmInterface):
         # --- Step 1: Construct Pseudo-IDs [cite: 227-231] ---
         needed_len = max(self.initial_pid_len, 2 * math.ceil(math.log2(num_tags + 1)))
         
+        # EPC 的 MD5 与 needed_len 无关，只算一次；扩位重试时直接复用
+        full_pids = {}
+        for tag in expected_tags:
+            if tag.epc not in full_pids:
+                h_val = int.from_bytes(hashlib.md5(tag.epc.encode()).digest(), 'big')
+                full_pids[tag.epc] = format(h_val, '0128b')
+
         while True:
             temp_pids = {}
             collision = False
             seen_pids = set()
             
             for tag in expected_tags:
-                h_val = int(hashlib.md5(tag.epc.encode()).hexdigest(), 16)
-                pid_bin = format(h_val, '0128b')[-needed_len:]
+                pid_bin = full_pids[tag.epc][-needed_len:]
                 if pid_bin in seen_pids:
                     collision = True
                     break
@@ -71,41 +84,39 @@ class CPT_Algorithm(AlgorithmInterface):
             else:
                 needed_len += 1 
         
-        # --- Step 2: Construct CPT [cite: 234-242] ---
         epc_list = [t.epc for t in expected_tags]
-        root = CPT_Node(epc_list)
+        pid_bytes = ''.join(self.pseudo_ids[epc] for epc in epc_list).encode('ascii')
+        self.bitmat = (np.frombuffer(pid_bytes, dtype=np.uint8) - ord('0')).reshape(len(epc_list), self.pid_length)
+        self.epc_to_row = {epc: i for i, epc in enumerate(epc_list)}
+        self._row_epc = np.array(epc_list, dtype=object)
+        self._pid_int = {epc: int(pid, 2) for epc, pid in self.pseudo_ids.items()}
+        self.present_mask = np.zeros(len(epc_list), dtype=bool)
+
+        # --- Step 2: Construct CPT [cite: 234-242] ---
+        root = CPT_Node(np.arange(len(epc_list), dtype=np.int32))
         self._build_tree_recursive(root)
         self._collect_leaves(root)
 
     def _build_tree_recursive(self, node: CPT_Node):
-        if len(node.tags) <= 2:
+        n = len(node.indices)
+        if n <= 2:
             return 
 
-        best_bit = -1
-        min_diff = float('inf')
-        
-        for b in range(self.pid_length):
-            count_0 = 0
-            count_1 = 0
-            for epc in node.tags:
-                if self.pseudo_ids[epc][b] == '0':
-                    count_0 += 1
-                else:
-                    count_1 += 1
-            
-            if count_0 > 0 and count_1 > 0:
-                diff = abs(count_0 - count_1)
-                if diff < min_diff:
-                    min_diff = diff
-                    best_bit = b
-                if diff == 0: break 
+        # 各位上 1 的个数；|count_0 - count_1| = |n - 2*count_1|
+        # 全 0 / 全 1 的位无法分裂，置为极大值；argmin 取首个最小值，与逐位扫描一致
+        sub = self.bitmat[node.indices]
+        count_1 = sub.sum(axis=0, dtype=np.int64)
+        diff = np.abs(2 * count_1 - n)
+        diff[(count_1 == 0) | (count_1 == n)] = 1 << 30
+        best_bit = int(diff.argmin())
         
-        if best_bit == -1:
+        if diff[best_bit] == 1 << 30:
             return 
 
         node.bit_index = best_bit
-        tags_0 = [epc for epc in node.tags if self.pseudo_ids[epc][best_bit] == '0']
-        tags_1 = [epc for epc in node.tags if self.pseudo_ids[epc][best_bit] == '1']
+        mask = sub[:, best_bit].astype(bool)
+        tags_0 = node.indices[~mask]
+        tags_1 = node.indices[mask]
         
         node.left = CPT_Node(tags_0, parent=node)
         node.left.bit_value_from_parent = 0
@@ -150,16 +161,18 @@ class CPT_Algorithm(AlgorithmInterface):
             payload_bits = 12 
         self.last_leaf_node = target_leaf
 
-        current_constraints = constraints
-        pids_ref = self.pseudo_ids
+        # 把路径约束打包成 (掩码, 期望值)，每个标签只需一次整数比较
+        top = self.pid_length - 1
+        c_mask = 0
+        c_value = 0
+        for bit_idx, expected_val in constraints:
+            c_mask |= 1 << (top - bit_idx)
+            c_value |= expected_val << (top - bit_idx)
+        pid_int = self._pid_int
 
         def protocol_logic(tag: Tag) -> bool:
-            if tag.epc not in pids_ref: return False
-            my_pid = pids_ref[tag.epc]
-            for bit_idx, expected_val in current_constraints:
-                if int(my_pid[bit_idx]) != expected_val:
-                    return False
-            return True
+            pid = pid_int.get(tag.epc)
+            return pid is not None and (pid & c_mask) == c_value
 
         return ReaderCommand(
             payload_bits=max(10, payload_bits),
@@ -179,7 +192,7 @@ class CPT_Algorithm(AlgorithmInterface):
         if result.status == PacketType.SUCCESS:
             # Singleton: 只有在未发生误码时才确认标签存在
             if not is_corrupted and result.resolved_data:
-                self.present_tags.add(result.resolved_data[0])
+                self.present_mask[self.epc_to_row[result.resolved_data[0]]] = True
             # 如果 is_corrupted 为 True，这部分数据被丢弃 (False Negative)，符合物理规律
                 
         elif result.status == PacketType.COLLISION:
@@ -189,9 +202,9 @@ class CPT_Algorithm(AlgorithmInterface):
                 responding_tags = result.tag_ids 
                 if responding_tags and len(responding_tags) <= 2:
                     for tag_epc in responding_tags:
-                        self.present_tags.add(tag_epc)
+                        self.present_mask[self.epc_to_row[tag_epc]] = True
             # 如果发生误码，曼彻斯特波形特征被破坏，无法区分是 2 个标签还是噪声，丢弃。
 
     def get_results(self):
-        missing = self.all_expected_epcs - self.present_tags
-        return self.present_tags, missing
\ No newline at end of file
+        return (set(self._row_epc[self.present_mask].tolist()),
+                set(self._row_epc[~self.present_mask].tolist()))
\ No newline at end of file
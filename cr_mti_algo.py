@@ -5,6 +5,7 @@ cr_mti_algo.py
 
 import math
 import hashlib
+import numpy as np
 from typing import List, Dict, Set, Tuple
 from framework import (
     AlgorithmInterface,
@@ -14,6 +15,18 @@ from framework import (
     Tag
 )
 
+def _md5_mod_all(prefixes: list, seed: int, mod: int) -> np.ndarray:
+    """对每个预编码的 MD5 前缀状态追加种子，返回 int(md5) % mod 数组 (与逐个哈希结果一致)"""
+    seed_b = str(seed).encode()
+
+    def _one(h):
+        h = h.copy()
+        h.update(seed_b)
+        return int.from_bytes(h.digest(), 'big') % mod
+
+    return np.fromiter(map(_one, prefixes), dtype=np.int64, count=len(prefixes))
+
+
 class CR_MTI_Algorithm(AlgorithmInterface):
     def __init__(self, lambda_factor: float = 15.0, w_len: int = 34):
         """
@@ -25,9 +38,9 @@ class CR_MTI_Algorithm(AlgorithmInterface):
         
         # 结果集
         self.all_expected_epcs = set()
-        # 核心逻辑变更：present_tags 初始包含所有，随着发现 missing 逐步减少
-        self.present_tags = set() 
-        self.missing_tags = set()
+        # 核心逻辑变更：初始假设全部在场，随着发现 missing 逐步减少
+        # 按行号存放的缺失标记，present = ~missing_mask
+        self.missing_mask = np.zeros(0, dtype=bool)
         
         # 迭代控制
         self.round_index = 0
@@ -40,17 +53,34 @@ class CR_MTI_Algorithm(AlgorithmInterface):
         self.seed = 0
         self.current_slot_index = 0
         
-        # 预计算缓存
-        self.slot_map: Dict[int, List[str]] = {}
+        # 预计算缓存 (EPC 行号固定，在 initialize 中建立)
+        self._epcs = np.empty(0, dtype=object)
+        self._epc_idx: Dict[str, int] = {}
+        self._slot_prefix: list = []
+        self._crs_prefix: list = []
+        # 本轮映射：按时隙排序的行号 + 每个时隙的起点/长度 (替代 dict-of-lists)
+        self.slot_order = np.empty(0, dtype=np.intp)
+        self.slot_starts = np.empty(0, dtype=np.intp)
+        self.slot_counts = np.empty(0, dtype=np.intp)
+        # 本轮每行的 CRS 位号 (数组用于按时隙批量判决)
+        self._crs_round = np.empty(0, dtype=np.int64)
+        # 本轮每行的时隙号与 CRS 位号 (list 便于逐标签 O(1) 取值)
+        self._slot_list: List[int] = []
+        self._crs_list: List[int] = []
         
         self.is_completed = False
 
     def initialize(self, expected_tags: List[Tag]):
         self.all_expected_epcs = {t.epc for t in expected_tags}
+        epcs = list(self.all_expected_epcs)
+        self._epcs = np.array(epcs, dtype=object)
+        self._epc_idx = {epc: i for i, epc in enumerate(epcs)}
+        # 前缀 "SLOT_{epc}_" / "CRS_{epc}_" 与轮次无关，只编码一次
+        self._slot_prefix = [hashlib.md5(f"SLOT_{epc}_".encode()) for epc in epcs]
+        self._crs_prefix = [hashlib.md5(f"CRS_{epc}_".encode()) for epc in epcs]
         
         # 初始状态：假设所有标签都在场 (Innocent until proven Guilty)
-        self.present_tags = self.all_expected_epcs.copy()
-        self.missing_tags = set()
+        self.missing_mask = np.zeros(len(epcs), dtype=bool)
         
         self.is_completed = False
         self.round_index = 0
@@ -80,19 +110,19 @@ class CR_MTI_Algorithm(AlgorithmInterface):
         self.current_slot_index = 0
         
         # 3. 预计算本轮映射 (Expected Mapping)
-        self.slot_map = {}
         # 只有目前认为 "Present" 的标签参与 Expected 构建吗？
         # 不，物理上所有在场标签都会发。逻辑上我们检查所有 Expected。
         # 只要 Expected 里的标签映射到位=0，它就是 Missing。
-        for epc in self.all_expected_epcs:
-            # 优化：已经确认为 Missing 的标签其实不需要再检查了，
-            # 但为了逻辑简单且防止 Ghost 导致的状态跳变，全量检查是安全的。
-            # 不过为了性能，我们可以只检查 unverified。
-            # 这里保持全量检查以符合 "Collision Resolving" 的全局观。
-            slot = self._hash_slot(epc, self.seed, self.frame_size)
-            if slot not in self.slot_map:
-                self.slot_map[slot] = []
-            self.slot_map[slot].append(epc)
+        # 这里保持全量检查以符合 "Collision Resolving" 的全局观。
+        slots = _md5_mod_all(self._slot_prefix, self.seed, self.frame_size)
+        crs = _md5_mod_all(self._crs_prefix, self.seed, self.w_len)
+        # 按时隙分桶：稳定排序 + bincount 得到每个时隙在 slot_order 中的区间
+        self.slot_order = np.argsort(slots, kind='stable')
+        self.slot_counts = np.bincount(slots, minlength=self.frame_size)
+        self.slot_starts = np.cumsum(self.slot_counts) - self.slot_counts
+        self._crs_round = crs
+        self._slot_list = slots.tolist()
+        self._crs_list = crs.tolist()
             
         self.round_index += 1
 
@@ -100,7 +130,8 @@ class CR_MTI_Algorithm(AlgorithmInterface):
         return self.is_completed
 
     def get_results(self):
-        return self.present_tags, self.missing_tags
+        return (set(self._epcs[~self.missing_mask].tolist()),
+                set(self._epcs[self.missing_mask].tolist()))
 
     def get_next_command(self, prev_result: SlotResult) -> ReaderCommand:
         # --- 1. 处理结果 ---
@@ -126,15 +157,14 @@ class CR_MTI_Algorithm(AlgorithmInterface):
                 # 但为了防止递归深度问题，这里让它流转下去，只是 current_slot_index 归零了
         
         # --- 3. 发送指令 ---
-        curr_seed = self.seed
-        curr_f = self.frame_size
         curr_slot = self.current_slot_index
-        target_ref = self.all_expected_epcs # 所有预期标签都应响应
+        # 所有预期标签都应响应；非预期 EPC 查不到行号，永不命中
+        epc_idx = self._epc_idx
+        slot_list = self._slot_list
 
         def protocol_logic(tag: Tag) -> bool:
-            if tag.epc not in target_ref: return False
-            s = self._hash_slot(tag.epc, curr_seed, curr_f)
-            return s == curr_slot
+            i = epc_idx.get(tag.epc)
+            return i is not None and slot_list[i] == curr_slot
 
         self.current_slot_index += 1
         
@@ -148,22 +178,22 @@ class CR_MTI_Algorithm(AlgorithmInterface):
         if processed_slot_idx < 0: return
 
         # 1. Expected
-        expected_tags = self.slot_map.get(processed_slot_idx, [])
-        if not expected_tags: return
-
-        expected_bit_map: Dict[int, List[str]] = {}
-        for epc in expected_tags:
-            b_idx = self._hash_crs(epc, self.seed, self.w_len)
-            if b_idx not in expected_bit_map: expected_bit_map[b_idx] = []
-            expected_bit_map[b_idx].append(epc)
+        if processed_slot_idx >= len(self.slot_counts): return
+        start = self.slot_starts[processed_slot_idx]
+        count = self.slot_counts[processed_slot_idx]
+        if count == 0: return
+        rows = self.slot_order[start:start + count]
 
         # 2. Observed
         ideal_crs = 0
         if result.tag_ids:
+            crs_list = self._crs_list
+            epc_idx = self._epc_idx
+            slot_list = self._slot_list
             for epc in result.tag_ids:
-                if self._hash_slot(epc, self.seed, self.frame_size) == processed_slot_idx:
-                    b = self._hash_crs(epc, self.seed, self.w_len)
-                    ideal_crs |= (1 << b)
+                i = epc_idx.get(epc)
+                if i is not None and slot_list[i] == processed_slot_idx:
+                    ideal_crs |= (1 << crs_list[i])
         
         noise = getattr(result, 'channel_noise_mask', 0)
         if noise is None: noise = 0
@@ -171,22 +201,16 @@ class CR_MTI_Algorithm(AlgorithmInterface):
 
         # 3. Verification (Negative Affirmation)
         # 我们只寻找 "Missing" 的证据 (Bit=0)
-        new_missing_found = False
-        for b_idx, mapped_epcs in expected_bit_map.items():
-            observed_bit = (observed_crs >> b_idx) & 1
-            
-            if observed_bit == 0:
-                # 证据确凿：这一位是0，说明映射到这里的所有标签都不在
-                for epc in mapped_epcs:
-                    if epc not in self.missing_tags:
-                        self.missing_tags.add(epc)
-                        if epc in self.present_tags:
-                            self.present_tags.remove(epc)
-                        new_missing_found = True
-            # else: observed_bit == 1
-            # 不能证明 Present，因为可能是被遮挡的。保持原状。
-
-        if new_missing_found:
+        # 证据确凿：某一位是0，说明映射到这一位的所有预期标签都不在
+        # 观测位图展开成 0/1 向量后，按各行的 CRS 位号一次性 gather
+        obs_bytes = observed_crs.to_bytes((self.w_len + 7) // 8, 'little')
+        obs_bits = np.unpackbits(np.frombuffer(obs_bytes, dtype=np.uint8), bitorder='little')
+        zero_rows = rows[obs_bits[self._crs_round[rows]] == 0]
+        # observed_bit == 1 不能证明 Present，因为可能是被遮挡的。保持原状。
+        new_rows = zero_rows[~self.missing_mask[zero_rows]]
+
+        if new_rows.size:
+            self.missing_mask[new_rows] = True
             self.has_new_missing_this_round = True
 
     def _check_convergence(self) -> bool:
@@ -206,13 +230,3 @@ class CR_MTI_Algorithm(AlgorithmInterface):
         if self.round_index >= self.max_rounds:
             return True
         return False
-
-    def _hash_slot(self, epc: str, seed: int, mod: int) -> int:
-        s = f"SLOT_{epc}_{seed}"
-        val = int(hashlib.md5(s.encode()).hexdigest(), 16)
-        return val % mod
-
-    def _hash_crs(self, epc: str, seed: int, mod: int) -> int:
-        s = f"CRS_{epc}_{seed}"
-        val = int(hashlib.md5(s.encode()).hexdigest(), 16)
-        return val % mod
\ No newline at end of file
@@ -5,6 +5,7 @@ ctmti_algo.py
 
 import math
 import hashlib
+import numpy as np
 from collections import deque
 from typing import List, Dict, Set, Tuple, Optional
 from framework import (
@@ -23,10 +24,12 @@ class CTMTI_Algorithm(AlgorithmInterface):
         """
         self.B = B
         
-        # 结果集
+        # 结果集：EPC 按排序后的行号映射，在场/缺失用布尔掩码记录
         self.all_expected_epcs = set()
-        self.present_tags = set()
-        self.missing_tags = set()
+        self._idx_epc = np.empty(0, dtype=object)
+        self._epc_idx: Dict[str, int] = {}
+        self.present_mask = np.zeros(0, dtype=bool)
+        self.missing_mask = np.zeros(0, dtype=bool)
         
         # 任务栈
         # 每个元素是一个元组: (tag_epcs_in_this_node, current_seed)
@@ -42,8 +45,10 @@ class CTMTI_Algorithm(AlgorithmInterface):
 
     def initialize(self, expected_tags: List[Tag]):
         self.all_expected_epcs = {t.epc for t in expected_tags}
-        self.present_tags.clear()
-        self.missing_tags.clear()
+        self._idx_epc = np.array(sorted(self.all_expected_epcs), dtype=object)
+        self._epc_idx = {epc: i for i, epc in enumerate(self._idx_epc.tolist())}
+        self.present_mask = np.zeros(len(self._idx_epc), dtype=bool)
+        self.missing_mask = np.zeros(len(self._idx_epc), dtype=bool)
         self.stack.clear()
         self.is_completed = False
         
@@ -57,7 +62,8 @@ class CTMTI_Algorithm(AlgorithmInterface):
         return self.is_completed
 
     def get_results(self):
-        return self.present_tags, self.missing_tags
+        return (set(self._idx_epc[self.present_mask].tolist()),
+                set(self._idx_epc[self.missing_mask].tolist()))
 
     def get_next_command(self, prev_result: SlotResult) -> ReaderCommand:
         # --- 1. 处理上一时隙的响应 ---
@@ -171,11 +177,11 @@ class CTMTI_Algorithm(AlgorithmInterface):
                 # 预期有 1 个标签 (Singleton)
                 if observed_bit == 1:
                     # 信号确认 -> 标记为 Present
-                    self.present_tags.add(expected_buckets[i][0])
+                    self.present_mask[self._epc_idx[expected_buckets[i][0]]] = True
                 else:
                     # 信号丢失 (1->0) -> 标记为 Missing (FP)
                     # 这是 Noisy 环境下 FP 的来源
-                    self.missing_tags.add(expected_buckets[i][0])
+                    self.missing_mask[self._epc_idx[expected_buckets[i][0]]] = True
                     
             else: # expected_count > 1
                 # 预期有冲突 (Collision)
@@ -188,11 +194,11 @@ class CTMTI_Algorithm(AlgorithmInterface):
                 else:
                     # 信号丢失 (1->0) -> 这一整组标签都被误判为 Missing
                     # 极其严重的 FP
-                    for t in expected_buckets[i]:
-                        self.missing_tags.add(t)
+                    epc_idx = self._epc_idx
+                    self.missing_mask[[epc_idx[t] for t in expected_buckets[i]]] = True
 
     def _hash(self, epc: str, seed: int, mod: int) -> int:
         """模拟 Collision Reconciling 的映射逻辑"""
         s = f"{epc}_{seed}"
-        val = int(hashlib.md5(s.encode()).hexdigest(), 16)
+        val = int.from_bytes(hashlib.md5(s.encode()).digest(), 'big')
         return val % mod
\ No newline at end of file
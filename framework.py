@@ -27,6 +27,9 @@ class PacketType(Enum):
     ACK = auto()
 
 class Tag:
+    # 固定属性集，省去每个实例的 __dict__ (大规模场景下成千上万个 Tag 对象)
+    __slots__ = ('epc', 'epc_int', 'is_present', 'rssi')
+
     def __init__(self, epc: str, is_present: bool = True):
         self.epc = epc
         self.epc_int = int(epc, 16)
@@ -155,6 +158,14 @@ def run_high_fidelity_simulation(algorithm: AlgorithmInterface,
     present_tags_count = len(present_tags)
     rssi_map = {t.epc: t.rssi for t in present_tags}
     
+    # 循环内不变的配置项提前取出，避免每个时隙重复属性查找
+    supports_phy = getattr(algorithm, 'supports_phy_impairments', False)
+    enable_noise = config.ENABLE_NOISE
+    ber = config.BIT_ERROR_RATE if enable_noise else 0.0
+    rand = random.random
+    drift_safe_bits = int(0.5 / config.CLOCK_DRIFT_RATE) if config.CLOCK_DRIFT_RATE > 0 else -1
+    has_structural = config.BURST_ERASURE_LEN > 0 or config.JITTER_OFFSET > 0
+    
     prev_result = SlotResult(PacketType.IDLE, [])
 
     while not algorithm.is_finished():
@@ -175,11 +186,7 @@ def run_high_fidelity_simulation(algorithm: AlgorithmInterface,
             total_tag_energy_j += present_tags_count * (t_reader_tx * 1e-6) * CONSTANTS['P_RX_TAG']
         
         # C. [PHY] 标签响应
-        responding_tags = []
-        protocol_logic = cmd.response_protocol
-        for tag in present_tags:
-            if protocol_logic(tag):
-                responding_tags.append(tag.epc)
+        responding_tags = [tag.epc for tag in filter(cmd.response_protocol, present_tags)]
 
         # D. [PHY] 结果判定
         total_slots += 1
@@ -218,7 +225,7 @@ def run_high_fidelity_simulation(algorithm: AlgorithmInterface,
         extra_impairments = None
 
         # 1. 整包丢失 (Preamble Loss)
-        if config.ENABLE_NOISE and random.random() < config.packet_error_rate:
+        if enable_noise and random.random() < config.packet_error_rate:
             status = PacketType.IDLE
         
         elif status != PacketType.IDLE:
@@ -226,20 +233,19 @@ def run_high_fidelity_simulation(algorithm: AlgorithmInterface,
             if expected_len > 0:
                 
                 # 随机比特翻转模拟
-                if config.ENABLE_NOISE and config.BIT_ERROR_RATE > 0:
+                # 逐位抽样: 全局 random 流与丢包 / 擦除等抽样共享，
+                # 调用次数必须保持不变，否则带种子的实验结果无法复现
+                if ber > 0:
                     for i in range(expected_len):
-                        if random.random() < config.BIT_ERROR_RATE:
+                        if rand() < ber:
                             noise_mask |= (1 << i)
                 
-                # 时钟漂移模拟
-                if config.CLOCK_DRIFT_RATE > 0:
-                    max_safe_bits = int(0.5 / config.CLOCK_DRIFT_RATE)
-                    if expected_len > max_safe_bits:
-                        for i in range(max_safe_bits, expected_len):
-                            noise_mask |= (1 << i)
+                # 时钟漂移模拟: [max_safe_bits, expected_len) 整段置 1
+                if 0 <= drift_safe_bits < expected_len:
+                    noise_mask |= ((1 << expected_len) - 1) ^ ((1 << drift_safe_bits) - 1)
                 
                 # 突发擦除与时序抖动注入
-                if config.BURST_ERASURE_LEN > 0 or config.JITTER_OFFSET > 0:
+                if has_structural:
                     erasure_mask = 0
                     
                     # 生成擦除掩码
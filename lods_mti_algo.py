@@ -38,6 +38,7 @@ class LODS_MTI_Algorithm(AlgorithmInterface):
             self.current_rho = target_rho
             
         self.sorted_tags_bin = []   
+        self.epc_int_sorted = []
         self.total_tags = 0
         self.cursor = 0
         self.is_running = True
@@ -58,6 +59,8 @@ class LODS_MTI_Algorithm(AlgorithmInterface):
         
         self.sorted_tags_bin = sorted(temp_list, key=lambda x: x['bin'])
         self.total_tags = len(self.sorted_tags_bin)
+        # 整数列单独存放，种子搜索直接切片，免去逐元素字典访问
+        self.epc_int_sorted = [d['int'] for d in self.sorted_tags_bin]
         self.cursor = 0
         self.is_running = True
         self.verified_present = set()
@@ -214,8 +217,7 @@ class LODS_MTI_Algorithm(AlgorithmInterface):
             reply_bits = max(4, min(desired_len, MAX_REPLY_BITS))
             num_logical_slots = max(1, reply_bits // active_rho)
             
-            current_group_indices = range(self.cursor, self.cursor + k)
-            epc_ints = [self.sorted_tags_bin[i]['int'] for i in current_group_indices]
+            epc_ints = self.epc_int_sorted[self.cursor : self.cursor + k]
             seed = self._find_perfect_seed(epc_ints, num_logical_slots)
             
             if seed is not None:
@@ -243,9 +245,11 @@ class LODS_MTI_Algorithm(AlgorithmInterface):
         crc_len = 5 if base_len < 32 else 16
         payload_cost = base_len + crc_len
         
+        # 前缀匹配直接在整数上做移位比较，省去每次 hex -> bin 字符串转换
+        mask_int = int(final_mask, 2) if final_mask else 0
+        mask_shift = 96 - len(final_mask)
         def protocol_logic(tag: Tag) -> bool:
-            t_bin = bin(int(tag.epc, 16))[2:].zfill(96)
-            return t_bin.startswith(final_mask)
+            return (tag.epc_int >> mask_shift) == mask_int
 
         cmd = ReaderCommand(
             payload_bits=payload_cost,
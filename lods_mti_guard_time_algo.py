@@ -112,8 +112,7 @@ class LODS_MTI_Guard_Time_Algorithm(LODS_MTI_Algorithm):
             reply_bits = max(4, min(desired_len, MAX_REPLY_BITS))
             num_logical_slots = max(1, reply_bits // active_rho)
             
-            current_group_indices = range(self.cursor, self.cursor + k)
-            epc_ints = [self.sorted_tags_bin[i]['int'] for i in current_group_indices]
+            epc_ints = self.epc_int_sorted[self.cursor : self.cursor + k]
             seed = self._find_perfect_seed(epc_ints, num_logical_slots)
             
             if seed is not None:
@@ -143,9 +142,11 @@ class LODS_MTI_Guard_Time_Algorithm(LODS_MTI_Algorithm):
         crc_len = 5 if base_len < 32 else 16
         payload_cost = base_len + crc_len
         
+        # 前缀匹配直接在整数上做移位比较，省去每次 hex -> bin 字符串转换
+        mask_int = int(final_mask, 2) if final_mask else 0
+        mask_shift = 96 - len(final_mask)
         def protocol_logic(tag):
-            t_bin = bin(int(tag.epc, 16))[2:].zfill(96)
-            return t_bin.startswith(final_mask)
+            return (tag.epc_int >> mask_shift) == mask_int
 
         # =================================================================
         # Phase 4: 指令生成 (Critical Change)
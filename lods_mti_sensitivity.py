@@ -5,9 +5,69 @@ lods_mti_sensitivity.py
 允许外部传入 tolerance_threshold (epsilon)。
 """
 
+import numpy as np
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import compress
 from typing import List, Tuple, Any, Set, Optional
 from framework import AlgorithmInterface, ReaderCommand, SlotResult, Tag, PacketType
 
+# EPC 定长位宽 (24 位十六进制)
+EPC_BITS = 96
+_LOW64 = (1 << 64) - 1
+# 完美哈希候选种子 0..15
+_SEEDS = np.arange(16, dtype=np.uint64)
+# NumPy >= 2.0 提供逐元素 popcount，旧版本退回 unpackbits 求和
+_bitwise_count = getattr(np, 'bitwise_count', None)
+# 每个 EPC 布局的种子缓存上限 (LRU 淘汰)
+_SEED_CACHE_SIZE = 10000
+
+
+def _build_sorted_layout(epcs) -> Tuple[tuple, tuple, np.ndarray, np.ndarray, OrderedDict, dict, dict]:
+    """
+    按 EPC 整数排序，并拆出高 32 位 / 低 64 位两个 uint64 数组 (供向量化种子搜索使用)。
+    排序结果只取决于 EPC 集合本身 (与 is_present、洗牌顺序无关)。
+    附带种子缓存与分片 / 分组计划表: 同一布局下 (start, k, mod_size) 唯一确定种子，
+    (start, limit_k) 唯一确定分片结果，(start, limit_k, rho, max_reply_bits) 唯一确定整组规划。
+    """
+    # 只保留整数形式: 定长 96 位下按整数排序与按二进制串排序等价
+    pairs = sorted((int(e, 16), e) for e in epcs)
+    # 列式存储 (SoA): 字符串列只用于输出结果，数值热路径只访问整数列。
+    # 96 位整数超出 uint64，整数列保留为 Python int 元组
+    epc_int = tuple(v for v, _ in pairs)
+    epc_hex = tuple(e for _, e in pairs)
+    n = len(epc_int)
+    epc_hi = np.fromiter((v >> 64 for v in epc_int), dtype=np.uint64, count=n)
+    epc_lo = np.fromiter((v & _LOW64 for v in epc_int), dtype=np.uint64, count=n)
+    # 结果在多个算法实例间共享，设为只读防止误改
+    epc_hi.flags.writeable = False
+    epc_lo.flags.writeable = False
+    return epc_hex, epc_int, epc_hi, epc_lo, OrderedDict(), {}, {}
+
+# 同一 worker 内各任务的 EPC 集合相同: 以 frozenset 为键缓存排序结果
+_cached_sorted_layout = lru_cache(maxsize=8)(_build_sorted_layout)
+
+
+def _slot_match_counts(slots: np.ndarray, responded: np.ndarray, rho: int,
+                       num_slots: int, noise_mask: int) -> np.ndarray:
+    """
+    分组内每个成员所在时隙的接收位计数 (理想叠加位图 ^ 信道噪声)，等价于逐成员掩码 + popcount。
+    回复位图最长 256 位，超出 int64，因此按字节视图整体计算。
+    完美哈希保证每个时隙至多一个成员: 响应者的计数为 rho - 翻转位数，未响应者即翻转位数。
+    """
+    nbits = num_slots * rho
+    noise_bytes = np.frombuffer((noise_mask & ((1 << nbits) - 1)).to_bytes((nbits + 7) // 8, 'little'),
+                                dtype=np.uint8)
+    if _bitwise_count is not None and 8 % rho == 0:
+        # 每字节拆成 8/rho 个时隙字段，逐字段硬件 popcount
+        fields = (noise_bytes[:, None] >> np.arange(0, 8, rho, dtype=np.uint8)) & np.uint8((1 << rho) - 1)
+        flips = _bitwise_count(fields).ravel()[slots]
+    else:
+        noise = np.unpackbits(noise_bytes, count=nbits, bitorder='little')
+        flips = noise.reshape(num_slots, rho).sum(axis=1)[slots]
+    return np.where(responded, rho - flips, flips)
+
+
 class LODS_MTI_Sensitivity(AlgorithmInterface):
     def __init__(self, 
                  max_group_size: int = 128, 
@@ -27,26 +87,30 @@ class LODS_MTI_Sensitivity(AlgorithmInterface):
         else:
             self.current_rho = target_rho
             
-        self.sorted_tags_bin = []   
+        self.epc_hex = ()
+        self.epc_int = ()
+        self._seed_cache = OrderedDict()
+        self._slice_plan = {}
+        self._group_plan = {}
         self.total_tags = 0
         self.cursor = 0
         self.is_running = True
         self.last_sent_context = [] 
+        self.last_sent_slots = None
+        self.last_sent_rho = 0
+        self.last_sent_num_slots = 0
         self.verified_present = set()
         self.verified_missing = set()
 
     def initialize(self, expected_tags: List[Tag]):
-        temp_list = []
-        for t in expected_tags:
-            b_str = bin(int(t.epc, 16))[2:].zfill(96)
-            temp_list.append({
-                'hex': t.epc,
-                'bin': b_str,
-                'int': t.epc_int
-            })
-        
-        self.sorted_tags_bin = sorted(temp_list, key=lambda x: x['bin'])
-        self.total_tags = len(self.sorted_tags_bin)
+        epc_set = frozenset(t.epc for t in expected_tags)
+        if len(epc_set) == len(expected_tags):
+            layout = _cached_sorted_layout(epc_set)
+        else:
+            # 存在重复 EPC 时集合会去重，不能走缓存
+            layout = _build_sorted_layout(t.epc for t in expected_tags)
+        self.epc_hex, self.epc_int, self.epc_hi, self.epc_lo, self._seed_cache, self._slice_plan, self._group_plan = layout
+        self.total_tags = len(self.epc_hex)
         self.cursor = 0
         self.is_running = True
         self.verified_present = set()
@@ -58,103 +122,157 @@ class LODS_MTI_Sensitivity(AlgorithmInterface):
         else:
             self.current_rho = self.target_rho
 
-    def _get_lcp(self, str1: str, str2: str) -> str:
-        l = min(len(str1), len(str2))
-        for i in range(l):
-            if str1[i] != str2[i]:
-                return str1[:i]
-        return str1[:l]
+    def _get_lcp(self, a_int: int, b_int: int) -> int:
+        """最长公共前缀长度: 一次异或 + bit_length，替代逐字符比较"""
+        return EPC_BITS - (a_int ^ b_int).bit_length()
 
-    def _find_dynamic_slice(self, start_idx: int, limit_k_override: int = None) -> Tuple[int, str]:
+    def _mask_of(self, epc_int: int, mask_len: int) -> Tuple[int, int]:
+        """前缀掩码以 (前缀值, 前缀长度) 表示"""
+        return epc_int >> (EPC_BITS - mask_len), mask_len
+
+    def _find_dynamic_slice(self, start_idx: int, limit_k_override: int = None) -> Tuple[int, Tuple[int, int]]:
         remaining = self.total_tags - start_idx
-        if remaining == 0: return 0, ""
+        if remaining == 0: return 0, (0, 0)
         limit_k = min(self.max_group_size, remaining)
-        if limit_k_override is not None:
-            limit_k = min(limit_k, limit_k_override)
+        if limit_k_override is not None: limit_k = min(limit_k, limit_k_override)
+
+        # 分片结果只取决于 (start, limit_k): 查计划表，同一 EPC 布局下各轮次共享
+        key = (start_idx, limit_k)
+        plan = self._slice_plan.get(key)
+        if plan is None:
+            plan = self._slice_plan[key] = self._scan_dynamic_slice(start_idx, limit_k)
+        return plan
+
+    def _scan_dynamic_slice(self, start_idx: int, limit_k: int) -> Tuple[int, Tuple[int, int]]:
+        ints = self.epc_int
+        tag_first = ints[start_idx]
         if start_idx + limit_k >= self.total_tags:
-            group_first = self.sorted_tags_bin[start_idx]['bin']
-            group_last = self.sorted_tags_bin[start_idx + limit_k - 1]['bin']
-            mask = self._get_lcp(group_first, group_last)
-            return limit_k, mask
-        for k in range(limit_k, 0, -1):
-            idx_last = start_idx + k - 1
-            tag_first = self.sorted_tags_bin[start_idx]['bin']
-            tag_last = self.sorted_tags_bin[idx_last]['bin']
-            current_lcp = self._get_lcp(tag_first, tag_last)
-            idx_outside = start_idx + k
-            tag_outside = self.sorted_tags_bin[idx_outside]['bin']
-            if tag_outside.startswith(current_lcp): continue 
-            else: return k, current_lcp     
-        return 1, self.sorted_tags_bin[start_idx]['bin']
-
-    def _find_perfect_seed(self, epc_ints: List[int], mod_size: int) -> Optional[int]:
-        for seed in range(16):
-            slots = set()
-            collision = False
-            for val in epc_ints:
-                s = (val ^ seed) % mod_size
-                if s in slots:
-                    collision = True
-                    break
-                slots.add(s)
-            if not collision: return seed
-        return None
+            group_last = ints[start_idx + limit_k - 1]
+            return limit_k, self._mask_of(tag_first, self._get_lcp(tag_first, group_last))
+
+        # 有序序列中各标签与首标签的 LCP 随下标单调不增。记外侧标签 (start+limit_k) 的 LCP 为 c，
+        # 则所求 k 即 "LCP 仍大于 c" 的前缀长度 —— 二分查找，O(log k) 次 LCP 计算
+        outside_lcp = self._get_lcp(tag_first, ints[start_idx + limit_k])
+        lo, hi = 1, limit_k
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._get_lcp(tag_first, ints[start_idx + mid]) > outside_lcp:
+                lo = mid + 1
+            else:
+                hi = mid
+        tag_last = ints[start_idx + lo - 1]
+        return lo, self._mask_of(tag_first, self._get_lcp(tag_first, tag_last))
+
+    def _hash_slots(self, start: int, k: int, mod_size: int, seeds: np.ndarray) -> np.ndarray:
+        """
+        分组 [start, start+k) 在各候选种子下的时隙 (epc ^ seed) % mod_size，形状 k × len(seeds)。
+        96 位取模按 hi * 2^64 + lo 拆分: ((hi % m) * (2^64 % m) + (lo ^ seed) % m) % m，
+        全程不超出 uint64 范围。
+        """
+        m = np.uint64(mod_size)
+        hi_part = (self.epc_hi[start:start + k] % m) * np.uint64((1 << 64) % mod_size)
+        lo = self.epc_lo[start:start + k]
+        return (hi_part[:, None] + (lo[:, None] ^ seeds[None, :]) % m) % m
+
+    def _find_perfect_seed(self, start: int, k: int, mod_size: int) -> Optional[int]:
+        """
+        在 16 个种子中寻找使 (epc ^ seed) % mod_size 无冲突的最小种子 (NumPy 向量化)。
+        结果按 (start, k, mod_size) 缓存，同一 worker 内后续轮次遇到相同分组直接复用。
+        """
+        key = (start, k, mod_size)
+        cache = self._seed_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        slots = self._hash_slots(start, k, mod_size, _SEEDS)   # 形状 k × 16
+        slots.sort(axis=0)
+        ok = ~(np.diff(slots, axis=0) == 0).any(axis=0)
+        seed = int(np.argmax(ok)) if ok.any() else None
+        cache[key] = seed
+        if len(cache) > _SEED_CACHE_SIZE:
+            cache.popitem(last=False)
+        return seed
+
+    def _plan_group(self, start: int, limit_k: int, active_rho: int, max_reply_bits: int) -> tuple:
+        """
+        分片 + 种子搜索 (失败则缩小分片重试) 的完整规划，
+        返回 (k, mask, seed, reply_bits, num_slots, slots)。
+        结果只取决于入参，按 EPC 布局缓存: 命中时整条重试链只需一次查表。
+        """
+        key = (start, limit_k, active_rho, max_reply_bits)
+        plan = self._group_plan.get(key)
+        if plan is not None:
+            return plan
+        plan = (0, (0, 0), 0, 0, 0)
+        search_k = limit_k
+        while search_k > 0:
+            k, mask = self._find_dynamic_slice(start, limit_k_override=search_k)
+            desired_len = k * active_rho
+            reply_bits = max(4, min(desired_len, max_reply_bits))
+            num_logical_slots = max(1, reply_bits // active_rho)
+            seed = self._find_perfect_seed(start, k, num_logical_slots)
+            if seed is not None:
+                plan = (k, mask, seed, reply_bits, num_logical_slots)
+                break
+            search_k = k - 1
+        if plan[0] > 0:
+            seed_arr = np.array([plan[2]], dtype=np.uint64)
+            slots = self._hash_slots(start, plan[0], plan[4], seed_arr)[:, 0].astype(np.intp)
+        else:
+            slots = np.zeros(0, dtype=np.intp)
+        slots.flags.writeable = False
+        plan = plan + (slots,)
+        self._group_plan[key] = plan
+        return plan
+
+    def _verify_last_group(self, actual_responders_set: Set[str], noise_mask: int) -> bool:
+        """
+        对上一条命令的分组做多数表决校验，并据错误率调整 rho。
+        返回 "在场但带误码" 标志，供下一组调度收紧回复长度。
+        """
+        group = self.last_sent_context
+        rho = self.last_sent_rho
+        responded = np.fromiter((epc in actual_responders_set for epc in group), dtype=bool, count=len(group))
+        match_counts = _slot_match_counts(self.last_sent_slots, responded, rho,
+                                          self.last_sent_num_slots, noise_mask)
+        vote_threshold = 3 if rho >= 4 else rho
+        
+        total_checks = len(group)
+        is_present = match_counts >= vote_threshold
+        is_imperfect = match_counts < rho
+        # 缺失 (计数 < 阈值 <= rho) 与带误码的在场判定均计为错误
+        error_cnt = int(is_imperfect.sum())
+        error_flag = bool((is_present & is_imperfect).any())
+        
+        # 整组一次性并入集合 (set.update 为 C 层循环)
+        self.verified_present.update(compress(group, is_present.tolist()))
+        self.verified_missing.update(compress(group, (~is_present).tolist()))
+        
+        # 【核心修改点】使用 self.tolerance_threshold 替代硬编码的 0.3
+        if self.is_adaptive and total_checks > 0:
+            error_rate = error_cnt / total_checks
+            # 这里的逻辑是：如果错误率 <= 阈值，说明信道还行，用高速
+            # 如果错误率 > 阈值，说明信道太差，保持 Robust
+            if error_rate <= self.tolerance_threshold:
+                self.current_rho = 2 
+            else:
+                self.current_rho = 4 
+        
+        self.last_sent_context = []
+        return error_flag
 
     def get_next_command(self, prev_result: SlotResult) -> ReaderCommand:
         error_flag = False
         if self.last_sent_context:
             # Phase 1: Verification & Adaptation
-            ideal_superimposed_bitmap = 0
             if prev_result.status != PacketType.IDLE:
                 actual_responders_set = set(prev_result.tag_ids)
             else:
                 actual_responders_set = set()
+            error_flag = self._verify_last_group(actual_responders_set, prev_result.channel_noise_mask)
 
-            for item in self.last_sent_context:
-                if item['epc'] in actual_responders_set:
-                    rho_used = item['rho']
-                    start_bit = item['slot'] * rho_used
-                    pattern = ((1 << rho_used) - 1) << start_bit
-                    ideal_superimposed_bitmap |= pattern
-
-            received_bitmap = ideal_superimposed_bitmap ^ prev_result.channel_noise_mask
-            last_rho = self.last_sent_context[0]['rho']
-            vote_threshold = 3 if last_rho >= 4 else last_rho
-            
-            total_checks = 0
-            error_cnt = 0
-            
-            for item in self.last_sent_context:
-                epc_hex = item['epc']
-                slot = item['slot']
-                rho = item['rho']
-                total_checks += 1
-                start_bit = slot * rho
-                expected_mask = ((1 << rho) - 1) << start_bit
-                segment = received_bitmap & expected_mask
-                match_count = bin(segment).count('1')
-                
-                if match_count >= vote_threshold:
-                    self.verified_present.add(epc_hex)
-                    if match_count < rho:
-                        error_flag = True
-                        error_cnt += 1
-                else:
-                    self.verified_missing.add(epc_hex)
-                    error_cnt += 1
-            
-            # 【核心修改点】使用 self.tolerance_threshold 替代硬编码的 0.3
-            if self.is_adaptive and total_checks > 0:
-                error_rate = error_cnt / total_checks
-                # 这里的逻辑是：如果错误率 <= 阈值，说明信道还行，用高速
-                # 如果错误率 > 阈值，说明信道太差，保持 Robust
-                if error_rate <= self.tolerance_threshold:
-                    self.current_rho = 2 
-                else:
-                    self.current_rho = 4 
-            
-            self.last_sent_context = []
-
+        # 游标单调前移: 有序数组中 cursor 之前的标签均已判定、之后均未判定，
+        # 后缀 [cursor:] 即活动集合，分片 / 种子搜索从不触及已判定标签，无需额外的活动掩码
         if self.cursor >= self.total_tags:
             self.is_running = False
             return ReaderCommand(payload_bits=-1, expected_reply_bits=0)
@@ -168,35 +286,22 @@ class LODS_MTI_Sensitivity(AlgorithmInterface):
         current_limit_k = min(self.max_group_size, max_phys_k)
         current_limit_k = min(current_limit_k, self.total_tags - self.cursor)
 
-        final_k = 0; final_mask = ""; final_seed = 0; final_reply_bits = 0; final_num_slots = 0
-        while current_limit_k > 0:
-            k, mask = self._find_dynamic_slice(self.cursor, limit_k_override=current_limit_k)
-            desired_len = k * active_rho
-            reply_bits = max(4, min(desired_len, MAX_REPLY_BITS))
-            num_logical_slots = max(1, reply_bits // active_rho)
-            current_group_indices = range(self.cursor, self.cursor + k)
-            epc_ints = [self.sorted_tags_bin[i]['int'] for i in current_group_indices]
-            seed = self._find_perfect_seed(epc_ints, num_logical_slots)
-            if seed is not None:
-                final_k = k; final_mask = mask; final_seed = seed
-                final_reply_bits = reply_bits; final_num_slots = num_logical_slots
-                break
-            else:
-                current_limit_k = k - 1
+        (final_k, final_mask, final_seed, final_reply_bits, final_num_slots,
+         final_slots) = self._plan_group(self.cursor, current_limit_k, active_rho, MAX_REPLY_BITS)
         
-        current_group = self.sorted_tags_bin[self.cursor : self.cursor + final_k]
-        current_context = []
-        for item in current_group:
-            s = (item['int'] ^ final_seed) % final_num_slots
-            current_context.append({'epc': item['hex'], 'slot': s, 'rho': active_rho})
-        self.last_sent_context = current_context
-
-        base_len = len(final_mask) + 4 + 4
+        # 上下文以列存储: EPC 元组 + 时隙数组，供下一轮整组向量化校验
+        self.last_sent_context = self.epc_hex[self.cursor : self.cursor + final_k]
+        self.last_sent_slots = final_slots
+        self.last_sent_rho = active_rho
+        self.last_sent_num_slots = final_num_slots
+
+        mask_val, mask_len = final_mask
+        base_len = mask_len + 4 + 4
         crc_len = 5 if base_len < 32 else 16
         payload_cost = base_len + crc_len
+        mask_shift = EPC_BITS - mask_len
         def protocol_logic(tag: Tag) -> bool:
-            t_bin = bin(int(tag.epc, 16))[2:].zfill(96)
-            return t_bin.startswith(final_mask)
+            return (tag.epc_int >> mask_shift) == mask_val
         cmd = ReaderCommand(payload_bits=payload_cost, expected_reply_bits=final_reply_bits, response_protocol=protocol_logic)
         self.cursor += final_k
         return cmd